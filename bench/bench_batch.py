@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares reading full text of many pages (as in --export and
+    --daemon): one page after another with WwwReader (previous
+    implementation) and with BatchReader using 1, 2, 4 and 8 processes.
+    Usage: bench_batch.py [pages] [server delay in ms]
+"""
+
+import os
+import sys
+import time
+import multiprocessing
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from frsslib import Http
+from frsslib.WwwReader import WwwReader
+from frsslib.BatchReader import BatchReader
+from server import LocalServer
+import corpus
+
+def sequential(urls):
+    wr = WwwReader(verbose=False)
+    for url in urls:
+        wr.read(url)
+
+def batch(workers):
+    def read(urls):
+        for _ in BatchReader(workers).read(urls):
+            pass
+    return read
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02
+    server = LocalServer()
+    urls = [server.add('/%d' % i, html, 'text/html', delay)
+            for (i, html) in enumerate(corpus.pages(count))]
+    server.start()
+
+    print '%d pages, %d ms delay, %d CPUs' % (
+        count, delay * 1000, multiprocessing.cpu_count())
+    for (name, read) in [('sequential (previous)', sequential)] + \
+            [('BatchReader, %d workers' % w, batch(w)) for w in (1, 2, 4, 8)]:
+        start = time.time()
+        read(urls)
+        elapsed = time.time() - start
+        Http.close()
+        print '  %-24s %6.2f s %8.1f pages/s' % (name, elapsed,
+                                                 count / elapsed)
+    server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares reading configuration of the channels: parsing every file with
+    ConfigObj (previous implementation) and reading the index, with and
+    without changed files.
+    Usage: bench_config.py [number of channels]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from copy import deepcopy
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from configobj import ConfigObj
+from frsslib.RssClient import RssClient
+
+CHANNEL = """Name           = Channel %d
+URL            = http://example.com/%d/rss.xml
+GetFullText    = %d
+ShowTitle      = 1
+ShowSubtitle   = 1
+HistoryLength  = 30
+Timeout        = 30
+RefreshInterval= 60
+"""
+
+def legacy_read(path_channels, file_names):
+    default_values = dict(GetFullText=0, ShowTitle=1, ShowSubtitle=1,
+                          HistoryLength=15, Timeout=30, RefreshInterval=0)
+    init_conf = ConfigObj(default_values)
+    channels = []
+    for file_name in file_names:
+        conf = deepcopy(init_conf)
+        conf.update(ConfigObj(os.path.join(path_channels, file_name)))
+        channels.append({'conf': conf})
+    return channels
+
+def timed(fn, runs):
+    start = time.time()
+    for _ in range(runs):
+        fn()
+    return (time.time() - start) / runs
+
+def main(runs=5):
+    n_channels = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    path = tempfile.mkdtemp()
+    path_channels = os.path.join(path, 'channels')
+    path_index = os.path.join(path, 'channels.index')
+    os.mkdir(path_channels)
+    try:
+        for i in range(n_channels):
+            with open(os.path.join(path_channels, 'ch%d' % i), 'w') as f:
+                f.write(CHANNEL % (i, i, i % 2))
+
+        def legacy():
+            _, _, file_names = os.walk(path_channels).next()
+            legacy_read(path_channels, file_names)
+        def cold():
+            os.path.exists(path_index) and os.remove(path_index)
+            RssClient(path_channels, None, path_index).read_config()
+        def warm():
+            RssClient(path_channels, None, path_index).read_config()
+        def one_changed():
+            path_ch = os.path.join(path_channels, 'ch0')
+            st = os.stat(path_ch)
+            os.utime(path_ch, (st.st_atime, st.st_mtime + 1))
+            RssClient(path_channels, None, path_index).read_config()
+
+        print '%d channels' % n_channels
+        for (name, fn) in (('ConfigObj (previous)', legacy),
+                           ('index, built', cold),
+                           ('index, 1 file changed', one_changed),
+                           ('index, unchanged', warm)):
+            print '  %-24s %7.1f ms' % (name, timed(fn, runs) * 1000)
+
+        # Access to the options in UI callbacks
+        conf = legacy_read(path_channels, ['ch1'])[0]['conf']
+        rssc = RssClient(path_channels, None, path_index)
+        rssc.read_config()
+        typed = rssc.channels[0]['conf']
+        n = 100000
+        start = time.time()
+        for _ in xrange(n):
+            int(conf['GetFullText']) and int(conf['HistoryLength'])
+        legacy_access = time.time() - start
+        start = time.time()
+        for _ in xrange(n):
+            typed.get_full_text and typed.history_length
+        typed_access = time.time() - start
+        print 'option access: int(conf[...]) %.2f us, attribute %.2f us' % (
+            legacy_access / n * 1e6, typed_access / n * 1e6)
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares load/save time of the pickle database with the SQLite one.
+    Usage: bench_db.py [number of items ...]
+"""
+
+import os
+import sys
+import time
+import pickle
+import shutil
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from frsslib.RssDatabase import RssDatabase
+
+ITEMS_PER_CHANNEL = 1000
+
+def make_channels(n_items):
+    channels = {}
+    for i in range(n_items):
+        name = u'Channel %d' % (i // ITEMS_PER_CHANNEL)
+        channels.setdefault(name, []).append(
+            {'title': u'Title of item %d' % i,
+             'link': u'http://example.com/item/%d' % i,
+             'summary': u'Summary of the item. ' * 5,
+             'new': i % 3 == 0})
+    return channels
+
+def timed(fn):
+    start = time.time()
+    fn()
+    return time.time() - start
+
+def bench(n_items):
+    path = tempfile.mkdtemp()
+    path_pickle = os.path.join(path, 'rss.pickle')
+    path_db = os.path.join(path, 'rss.db')
+    channels = make_channels(n_items)
+    results = {}
+    try:
+        def pickle_save():
+            with open(path_pickle, 'wb') as f:
+                pickle.dump(channels, f)
+        def pickle_load():
+            with open(path_pickle, 'rb') as f:
+                pickle.load(f)
+        results['pickle save'] = timed(pickle_save)
+        results['pickle load'] = timed(pickle_load)
+
+        shutil.copy(path_pickle, path_db)
+        db = RssDatabase(path_db, None)
+        results['sqlite migrate'] = timed(db.load)
+        db.conn.close()
+
+        db = RssDatabase(path_db, None)
+        def sqlite_open():
+            db.load()
+            db.channels[u'Channel 0']
+        results['sqlite load (1 channel)'] = timed(sqlite_open)
+
+        def sqlite_flip():
+            db.mark(u'Channel 0', db.channels[u'Channel 0'][0], True)
+            db.save()
+        results['sqlite save (1 flag)'] = timed(sqlite_flip)
+
+        def sqlite_channel():
+            db.channels[u'Channel 0'].reverse()
+            db.dirty_channels.add(u'Channel 0')
+            db.save()
+        results['sqlite save (1 channel)'] = timed(sqlite_channel)
+        db.conn.close()
+    finally:
+        shutil.rmtree(path)
+    return results
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    for n_items in sizes:
+        print '%d items' % n_items
+        for (name, elapsed) in sorted(bench(n_items).items()):
+            print '  %-25s %8.3f s' % (name, elapsed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares reading of full text with the previous implementation (whole
+    response downloaded, then parsed) for an article, an article in
+    ISO-8859-2 declared only by the server, a huge page without
+    Content-Length, a PDF and a video: time, peak memory and bytes sent by
+    the server.
+    Usage: bench_download.py [size of the large files in MB]
+"""
+
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from readability.htmls import build_doc
+from frsslib.WwwReader import WwwReader
+from frsslib import Http
+from server import LocalServer
+import corpus
+
+def previous_read(url):
+    reader = WwwReader(verbose=False)
+    html = Http.get(url).content
+    doc, _ = build_doc(html)
+    return reader._html2text(reader._extract_doc(doc))
+
+def current_read(url):
+    return WwwReader(verbose=False).read(url)
+
+def measure(read, url):
+    """ Reads the page in a child process, returns wall time, peak memory
+        and the result (length of the text or the error)
+    """
+    rfd, wfd = os.pipe()
+    start = time.time()
+    pid = os.fork()
+    if pid == 0:
+        os.close(rfd)
+        try:
+            result = '%d chars' % len(read(url))
+        except Exception as e:
+            result = e.__class__.__name__
+        os.write(wfd, result)
+        os._exit(0)
+    os.close(wfd)
+    _, _, usage = os.wait4(pid, 0)
+    result = os.read(rfd, 1024)
+    os.close(rfd)
+    return time.time() - start, usage.ru_maxrss, result
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    srv = LocalServer()
+    article = corpus.page(0)
+    latin2 = article.decode('utf-8').encode('iso-8859-2').replace(
+        '<meta charset="utf-8">', '')
+    filler = '<p style="display: none">%s</p>\n' % ('x' * 1000)
+    huge = article.replace('</body>',
+                           filler * (size * 1024 * 1024 / len(filler)) +
+                           '</body>')
+    binary = os.urandom(1024 * 1024) * size
+    urls = [
+        ('article', srv.add('/article', article, 'text/html')),
+        ('article, charset by server', srv.add(
+            '/latin2', latin2, 'text/html; charset=iso-8859-2')),
+        ('huge page, no length', srv.add('/huge', huge, 'text/html',
+                                         length=False)),
+        ('PDF', srv.add('/doc.pdf', binary, 'application/pdf')),
+        ('video, no length', srv.add('/video', binary, 'video/mp4',
+                                     length=False)),
+    ]
+    srv.start()
+
+    print 'Large files: %d MB, page size limit: %d MB' % (
+        size, Http.policy['max_page_size'] / 1024 / 1024)
+    print '  %-28s %-9s %9s %9s %10s  %s' % ('page', 'reader', 'time',
+                                             'peak RSS', 'sent', 'result')
+    for (name, url) in urls:
+        for (reader, read) in (('previous', previous_read),
+                               ('current', current_read)):
+            sent = srv.sent
+            elapsed, rss, result = measure(read, url)
+            # Server may still be writing into the socket which has been
+            # closed
+            time.sleep(0.2)
+            print '  %-28s %-9s %6.0f ms %6.1f MB %7.1f MB  %s' % (
+                name, reader, elapsed * 1000, rss / 1024.0,
+                (srv.sent - sent) / 1024.0 / 1024, result)
+    srv.stop()
+
+if __name__ == '__main__':
+    main()
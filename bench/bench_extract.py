@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares full text extraction with the previous implementation (three
+    regex passes, readability, BeautifulSoup and five more regex passes):
+    CPU time, peak memory and equality of the output.
+"""
+
+import os
+import re
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from frsslib.WwwReader import WwwReader
+import corpus
+
+def legacy_read(html):
+    from readability.readability import Document
+    from bs4 import BeautifulSoup
+    for tag in ['a', 'strong', 'em']:
+        pattern = '< ?' + tag + '.*?>(.*?)< ?/' + tag + ' ?>'
+        html = re.sub(pattern, '\\1', html, flags=re.I)
+    html = Document(html).summary().encode('utf-8').strip()
+
+    html = html.replace('<b>', '_BOLD_1')
+    html = html.replace('</b>', '_BOLD_0')
+    soup = BeautifulSoup(html, 'lxml')
+    text = soup.get_text('\n').encode('utf-8')
+    text = text.replace('\t', ' ')
+    text = re.sub(' +', ' ', text)
+    text = re.sub('\n{3,}', '\n\n', text)
+    text = re.sub('^ +', '', text, flags=re.MULTILINE)
+    text = re.sub('^[^a-zA-Z]+$', '', text, flags=re.MULTILINE)
+    text = text.replace('_BOLD_1', '\033[96m\033[1m')
+    text = text.replace('_BOLD_0', '\033[0m')
+    return text
+
+def current_read(html):
+    wr = WwwReader()
+    return wr._html2text(wr._extract(html))
+
+def measure(read, pages):
+    """ Runs extraction in a child process, returns CPU time and peak memory
+    """
+    pid = os.fork()
+    if pid == 0:
+        for html in pages:
+            read(html)
+        os._exit(0)
+    _, _, usage = os.wait4(pid, 0)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+
+def main(count=50):
+    pages = corpus.pages(count)
+
+    # Imports are not measured
+    legacy_read(pages[0])
+    current_read(pages[0])
+
+    different = sum(legacy_read(html) != current_read(html) for html in pages)
+    print '%d pages, %d with different output' % (count, different)
+    for (name, read) in (('legacy', legacy_read), ('current', current_read)):
+        cpu, rss = measure(read, pages)
+        print '%-8s CPU per page: %6.2f ms  peak RSS: %6.1f MB' % (
+            name, cpu / count * 1000, rss / 1024.0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Counts connections opened to download feeds and articles from two
+    local hosts, with and without the shared HTTP session.
+"""
+
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import requests
+from frsslib import Http
+from server import LocalServer
+
+def run(get, urls):
+    servers = [LocalServer(), LocalServer()]
+    urls = [server.add('/%d' % i, 'x' * 10000, 'text/html')
+            for i in range(urls) for server in servers]
+    for server in servers:
+        server.start()
+    start = time.time()
+    for url in urls:
+        get(url).content
+    elapsed = time.time() - start
+    connections = sum(server.connections for server in servers)
+    Http.close()
+    for server in servers:
+        server.stop()
+    return len(urls), connections, elapsed
+
+def main(urls=100):
+    for (name, get) in (('requests.get', lambda url: requests.get(url, timeout=10)),
+                        ('Http.get', Http.get)):
+        n, connections, elapsed = run(get, urls)
+        print '%-14s requests: %4d  connections: %4d  time: %.2f s' % (
+            name, n, connections, elapsed)
+
+if __name__ == '__main__':
+    main()
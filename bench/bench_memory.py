@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares memory used by the items of all the channels: dictionaries
+    with summaries (previous implementation) and Item records whose
+    summaries are loaded from the database when they are shown. Also
+    compares keeping the whole feedparser results with keeping only feed
+    titles.
+    Usage: bench_memory.py [number of items]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import feedparser
+from frsslib.RssDatabase import RssDatabase, Item
+import corpus
+
+ITEMS_PER_CHANNEL = 1000
+FEED_CHANNELS = 100
+FEED_ITEMS = 15
+
+FEED = u"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>Feed</title>
+<description>Subtitle</description>%s</channel></rss>
+"""
+FEED_ITEM = u"""<item><title>Article %d</title>
+<link>http://example.com/article/%d</link>
+<description><![CDATA[%s]]></description></item>
+"""
+
+_summaries = {}
+
+def summary(i):
+    """ Returns summary of an item (about 500 characters)
+    """
+    if i % 50 not in _summaries:
+        paragraph = corpus.page(i % 50, 1).decode('utf-8')
+        _summaries[i % 50] = paragraph[paragraph.index(u'<p>'):][:500]
+    # Every item has its own copy
+    return _summaries[i % 50][:-1] + _summaries[i % 50][-1]
+
+def make_db(path, n_items):
+    db = RssDatabase(path, None)
+    db.load()
+    for i in range(n_items):
+        name = u'Channel %d' % (i // ITEMS_PER_CHANNEL)
+        db.channels.setdefault(name, []).append(
+            Item(u'Title of item %d' % i, u'http://example.com/item/%d' % i,
+                 summary(i), i % 3 == 0))
+        db.dirty_channels.add(name)
+    db.save()
+    db.conn.close()
+
+def legacy_items(path):
+    """ Items loaded the way it was done before: dictionaries with
+        summaries
+    """
+    db = RssDatabase(path, None)
+    db.load()
+    channels = {}
+    for name in db.channels.names:
+        rows = db.conn.execute('SELECT title, link, summary, new FROM items '
+                               'WHERE channel = ? ORDER BY position', (name,))
+        channels[name] = [{'title': title, 'link': link, 'summary': summary,
+                           'new': bool(new)}
+                          for (title, link, summary, new) in rows]
+    return channels
+
+def current_items(path):
+    db = RssDatabase(path, None)
+    db.load()
+    for name in db.channels.names:
+        db.channels[name]
+    return db
+
+def current_items_read(path):
+    """ Items whose 1% of summaries have been shown
+    """
+    db = current_items(path)
+    for name in db.channels.names:
+        for item in db.channels[name][::100]:
+            item.summary
+    return db
+
+def feeds():
+    """ Parses feeds of the channels one by one
+    """
+    body = (FEED % u''.join(FEED_ITEM % (i, i, summary(i))
+                            for i in range(FEED_ITEMS))).encode('utf-8')
+    for _ in range(FEED_CHANNELS):
+        yield feedparser.parse(body)
+
+def legacy_feeds():
+    return list(feeds())
+
+def current_feeds():
+    results = []
+    for rss in feeds():
+        feed = rss['feed']
+        results.append({'feed': {k: feed[k] for k in ('title', 'subtitle')
+                                 if k in feed},
+                        'items': []})
+    return results
+
+def measure(fn, *args):
+    """ Runs fn in a child process, returns peak memory [kB]
+    """
+    pid = os.fork()
+    if pid == 0:
+        fn(*args)
+        os._exit(0)
+    _, _, usage = os.wait4(pid, 0)
+    return usage.ru_maxrss
+
+def main():
+    n_items = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    path = tempfile.mkdtemp()
+    try:
+        # Database is made in a child process, so that memory of this
+        # process doesn't grow
+        path_db = os.path.join(path, 'rss.db')
+        measure(make_db, path_db, n_items)
+        baseline = measure(lambda: None)
+
+        print '%d items in %d channels' % (n_items, n_items // ITEMS_PER_CHANNEL)
+        for (name, fn) in (('dictionaries', legacy_items),
+                           ('Item records', current_items),
+                           ('Item records, 1% read', current_items_read)):
+            print '  %-24s peak RSS: +%6.1f MB' % (
+                name, (measure(fn, path_db) - baseline) / 1024.0)
+
+        print 'feedparser results of %d channels' % FEED_CHANNELS
+        for (name, fn) in (('kept', legacy_feeds),
+                           ('titles only', current_feeds)):
+            print '  %-24s peak RSS: +%6.1f MB' % (
+                name, (measure(fn) - baseline) / 1024.0)
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    main()
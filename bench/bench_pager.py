@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares preparing a long article for the pager: wrapping all the lines
+    with textwrap.fill (previous implementation), wrapping the first screen
+    only and taking the rendering from the cache when the article is opened
+    again.
+    Usage: bench_pager.py [article size in KB]
+"""
+
+import os
+import sys
+import time
+import random
+from textwrap import fill
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import feeds
+from frsslib.Pager import Rendering, RenderCache
+
+WIDTH = 120
+HEIGHT = 40
+
+def article(size):
+    """ Returns article (UTF-8) with highlighted headers and long paragraphs
+    """
+    rnd = random.Random(0)
+    paragraphs = []
+    length = 0
+    while length < size:
+        paragraph = u'\033[96m\033[1mHeader %d\033[0m\n%s' % (
+            len(paragraphs), feeds.text(rnd, rnd.randint(200, 3000)))
+        paragraphs.append(paragraph)
+        length += len(paragraph)
+    return u'\n\n'.join(paragraphs).encode('utf-8')
+
+def timed(fn, runs=5):
+    start = time.time()
+    for _ in range(runs):
+        fn()
+    return (time.time() - start) / runs
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    text = article(size * 1024)
+    cache = RenderCache()
+    cache.put('article', text, WIDTH)
+
+    print '%d KB article, %d columns' % (len(text) // 1024, WIDTH)
+    for (name, fn) in (
+            ('fill, whole text (previous)',
+             lambda: '\n'.join(fill(line, WIDTH)
+                               for line in text.split('\n'))),
+            ('wrap, first screen',
+             lambda: Rendering(text, WIDTH).wrap(HEIGHT)),
+            ('wrap, whole text',
+             lambda: list(Rendering(text, WIDTH))),
+            ('cached, opened again',
+             lambda: cache.get('article', WIDTH).wrap(HEIGHT))):
+        print '  %-30s %8.2f ms' % (name, timed(fn) * 1000)
+
+if __name__ == '__main__':
+    main()
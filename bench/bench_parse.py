@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares reading a large feed with feedparser (whole document) and
+    with the streaming parser which stops at HistoryLength items: wall time,
+    CPU time and peak memory. Feeds are served by a local server.
+"""
+
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import feedparser
+from frsslib import FeedStream
+from frsslib import Http
+from server import LocalServer
+import corpus
+
+RSS = u"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>Archive</title>
+<description>All the articles</description>
+%s
+</channel></rss>
+"""
+RSS_ITEM = u"""<item><title>Article %d</title>
+<link>http://example.com/article/%d</link>
+<description><![CDATA[%s]]></description></item>
+"""
+
+ATOM = u"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Archive</title>
+<subtitle>All the articles</subtitle>
+%s
+</feed>
+"""
+ATOM_ITEM = u"""<entry><title>Article %d</title>
+<link href="http://example.com/article/%d"/>
+<summary type="html">%s</summary></entry>
+"""
+
+def feed(template, item_template, count):
+    """ Returns feed (utf-8 encoded) with 'count' items
+    """
+    from xml.sax.saxutils import escape
+    paragraph = corpus.page(0, 2).decode('utf-8')
+    paragraph = paragraph[paragraph.index(u'<p>'):paragraph.index(u'</p>')]
+    if template is ATOM:
+        paragraph = escape(paragraph)
+    items = u''.join(item_template % (i, i, paragraph) for i in range(count))
+    return (template % items).encode('utf-8')
+
+def legacy_read(url, limit):
+    response = Http.get(url)
+    rss = feedparser.parse(response.content)
+    return rss['items'][:limit]
+
+def current_read(url, limit):
+    response = Http.get(url, stream=True)
+    try:
+        return FeedStream.read(response, limit)['items']
+    finally:
+        response.close()
+
+def measure(read, url, limit, runs):
+    """ Reads the feed in a child process, returns wall time, CPU time and
+        peak memory
+    """
+    pid = os.fork()
+    if pid == 0:
+        for _ in range(runs):
+            read(url, limit)
+        os._exit(0)
+    start = time.time()
+    _, _, usage = os.wait4(pid, 0)
+    return ((time.time() - start) / runs,
+            (usage.ru_utime + usage.ru_stime) / runs, usage.ru_maxrss)
+
+def main(count=5000, limit=15, runs=3):
+    server = LocalServer()
+    urls = []
+    for (name, template, item) in (('rss', RSS, RSS_ITEM),
+                                   ('atom', ATOM, ATOM_ITEM)):
+        body = feed(template, item, count)
+        urls.append((name, len(body), server.add('/' + name, body)))
+    server.start()
+    try:
+        # Imports are not measured
+        legacy_read(urls[0][2], limit)
+        current_read(urls[0][2], limit)
+
+        for (name, size, url) in urls:
+            same = ([{k: item[k] for k in ('title', 'link', 'summary')}
+                     for item in legacy_read(url, limit)] ==
+                    current_read(url, limit))
+            print '%s: %d items, %.1f MB, same first %d items: %s' % (
+                name, count, size / 1024.0 / 1024.0, limit, same)
+            for (method, read) in (('feedparser', legacy_read),
+                                   ('streaming', current_read)):
+                # Memory of the process which doesn't read anything
+                _, _, baseline = measure(lambda url, limit: None, url, limit, 1)
+                wall, cpu, rss = measure(read, url, limit, runs)
+                print '  %-10s wall: %7.1f ms  CPU: %7.1f ms  ' \
+                      'peak RSS: +%5.1f MB' % (method, wall * 1000, cpu * 1000,
+                                             (rss - baseline) / 1024.0)
+    finally:
+        Http.close()
+        server.stop()
+
+if __name__ == '__main__':
+    main()
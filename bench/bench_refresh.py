@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares sequential and concurrent update of channels served with
+    different delays by a local server.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from frsslib.RssClient import RssClient
+from frsslib import Http
+from server import LocalServer
+
+FEED = """<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Feed %d</title>
+<item><title>Item</title><link>http://example.com/%d</link>
+<description>Text</description></item>
+</channel></rss>
+"""
+
+def main(channels=20, max_delay=1.0):
+    # All the feeds are served by one host
+    Http.configure(host_connections=channels)
+    server = LocalServer()
+    path_channels = tempfile.mkdtemp()
+    try:
+        for i in range(channels):
+            delay = max_delay * (i + 1) / channels
+            url = server.add('/feed%d.xml' % i, FEED % (i, i), delay=delay)
+            with open(os.path.join(path_channels, 'ch%d' % i), 'w') as f:
+                f.write('Name = Channel %d\nURL = %s\n' % (i, url))
+        server.start()
+
+        rssc = RssClient(path_channels)
+        rssc.read_config()
+        results = []
+        for workers in (1, channels):
+            start = time.time()
+            rssc.update_all(workers, channels)
+            results.append((workers, time.time() - start))
+    finally:
+        Http.close()
+        server.stop()
+        shutil.rmtree(path_channels)
+
+    print
+    print 'slowest feed: %.2f s' % max_delay
+    for workers, elapsed in results:
+        print 'workers: %3d  wall time: %.2f s' % (workers, elapsed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Simulates a week of frss being started every 30 minutes with channels
+    which publish daily, every 6 hours and hourly. Compares the number of
+    downloads when every channel is refreshed at start (previous
+    implementation) and when only the channels which are due are refreshed,
+    and how long it takes until a new item is seen.
+    Usage: bench_schedule.py [channels]
+"""
+
+import os
+import sys
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from frsslib.Scheduler import Scheduler
+
+HOUR = 3600
+DAYS = 7
+RUN_INTERVAL = HOUR / 2
+
+# Share of the channels, interval between their items [s]
+PROFILES = ((0.8, 24 * HOUR), (0.15, 6 * HOUR), (0.05, HOUR))
+
+class Conf(object):
+    def __init__(self, name):
+        self.name = name
+        self.refresh_interval = 0
+
+def channels(count):
+    """ Returns channels and times when their items are published
+    """
+    rnd = random.Random(0)
+    result = []
+    for (share, interval) in PROFILES:
+        for _ in range(int(count * share)):
+            ch = {'conf': Conf(len(result)), 'broken': False,
+                  'updating': False, 'rss': {}, 'hints': {}}
+            start = rnd.uniform(0, interval)
+            published = [start + i * interval + rnd.uniform(-0.1, 0.1) * interval
+                         for i in range(int(DAYS * 24 * HOUR / interval) + 1)]
+            result.append((ch, published))
+    return result
+
+def simulate(count, scheduled):
+    """ Returns number of downloads and average delay of new items [s]
+    """
+    random.seed(0)
+    scheduler = Scheduler()
+    chs = channels(count)
+    seen = dict((ch['conf'].name, 0) for (ch, _) in chs) # items seen so far
+    downloads = 0
+    delays = []
+    now = 0
+    while now < DAYS * 24 * HOUR:
+        if scheduled:
+            # Every start is a new session, only the schedule is kept
+            scheduler = Scheduler(schedule=scheduler.channels)
+            due = set(id(ch) for ch in scheduler.due([c for (c, _) in chs],
+                                                     now))
+        for (ch, published) in chs:
+            if scheduled and id(ch) not in due:
+                continue
+            downloads += 1
+            name = ch['conf'].name
+            available = [t for t in published if t <= now]
+            added = len(available) - seen[name]
+            delays.extend(now - t for t in available[seen[name]:])
+            seen[name] = len(available)
+            scheduler.done(ch, added, now)
+        now += RUN_INTERVAL
+    return downloads, sum(delays) / max(len(delays), 1)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print '%d channels, %d days, started every %d minutes' % (
+        count, DAYS, RUN_INTERVAL // 60)
+    for (name, scheduled) in (('every channel (previous)', False),
+                              ('channels which are due', True)):
+        downloads, delay = simulate(count, scheduled)
+        print '  %-26s downloads: %6d  average delay of items: %5.1f h' % (
+            name, downloads, delay / HOUR)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Measures startup time of frss -V, frss -u -x and frss -u (CUI is closed
+    as soon as it appears) and lists heavy modules which have been imported.
+    Empty configuration is used, so nothing is downloaded.
+    Usage: bench_startup.py [runs]
+"""
+
+import os
+import sys
+import pty
+import time
+import select
+import shutil
+import tempfile
+
+FRSS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    '..', 'usr', 'bin', 'frss')
+
+# These should be imported only when they are needed
+HEAVY = ('feedparser', 'requests', 'lxml', 'readability', 'bs4')
+
+# Runs frss and writes names of the imported modules to a file
+WRAPPER = """
+import sys, atexit
+def report():
+    with open(%r, 'w') as f:
+        f.write(' '.join(sys.modules))
+atexit.register(report)
+sys.argv = ['frss'] + %r
+execfile(%r, {'__name__': '__main__'})
+"""
+
+def run(args, home, path_modules, cui):
+    env = dict(os.environ, HOME=home, TERM='xterm')
+    cmd = [sys.executable, '-c', WRAPPER % (path_modules, args, FRSS)]
+    start = time.time()
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.execve(sys.executable, cmd, env)
+
+    # Quit CUI as soon as something is displayed
+    while True:
+        select.select([fd], [], [], 1)
+        try:
+            data = os.read(fd, 65536)
+        except OSError:
+            break
+        if not data:
+            break
+        if cui:
+            os.write(fd, 'q')
+            cui = False
+    os.waitpid(pid, 0)
+    elapsed = time.time() - start
+
+    with open(path_modules) as f:
+        modules = f.read().split()
+    heavy = sorted(set(m.split('.')[0] for m in modules
+                       if m.split('.')[0] in HEAVY))
+    return elapsed, heavy
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    home = tempfile.mkdtemp()
+    path_modules = os.path.join(home, 'modules')
+    try:
+        for (args, cui) in ((['-V'], False), (['-u', '-x'], False),
+                            (['-u'], True)):
+            times = []
+            for _ in range(runs):
+                elapsed, heavy = run(args, home, path_modules, cui)
+                times.append(elapsed)
+            times.sort()
+            print 'frss %-6s median: %6.1f ms  min: %6.1f ms  heavy: %s' % (
+                ' '.join(args), times[len(times) // 2] * 1000, times[0] * 1000,
+                ', '.join(heavy) or '-')
+    finally:
+        shutil.rmtree(home)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares extraction of full text with readability only (previous
+    implementation) and with templates learned for each host. Pages of
+    every host share the layout; the last host changes it halfway, so the
+    template has to be learned again.
+    Usage: bench_templates.py [pages per host]
+"""
+
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from frsslib.WwwReader import WwwReader
+from frsslib.Templates import Templates
+import corpus
+
+def hosts(count):
+    """ Returns host -> pages
+    """
+    result = {}
+    for site in range(len(corpus.SITES)):
+        result['site%d.example.com' % site] = corpus.pages(count, site=site)
+    changed = corpus.pages(count, site=1)
+    result['changed.example.com'] = changed[:count // 2] + \
+        corpus.pages(count, site=2)[count // 2:]
+    return result
+
+def extract(reader, host, pages):
+    """ Returns time of extraction and the texts
+    """
+    texts = []
+    start = time.time()
+    for html in pages:
+        texts.append(reader._html2text(reader._extract(html, host)))
+    return time.time() - start, texts
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    templates = Templates()
+    readability = WwwReader(verbose=False)
+    learned = WwwReader(verbose=False, templates=templates)
+
+    print '%d pages per host' % count
+    print '  %-22s %12s %12s %8s %6s' % ('host', 'readability', 'templates',
+                                        'speedup', 'same')
+    totals = [0.0, 0.0]
+    for (host, pages) in sorted(hosts(count).items()):
+        before, expected = extract(readability, host, pages)
+        after, texts = extract(learned, host, pages)
+        totals[0] += before
+        totals[1] += after
+        same = sum(a == b for (a, b) in zip(expected, texts))
+        print '  %-22s %9.1f ms %9.1f ms %7.1fx %3d/%d' % (
+            host, before * 1000, after * 1000, before / after, same, count)
+    print '  %-22s %9.1f ms %9.1f ms %7.1fx' % (
+        'total', totals[0] * 1000, totals[1] * 1000, totals[0] / totals[1])
+
+if __name__ == '__main__':
+    main()
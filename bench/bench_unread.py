@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares the operations behind the list of channels and marking an item
+    with the previous implementation: looking for unread items in every
+    channel (any() over loaded channels, a query for the others) versus
+    the counters kept by the database, rebuilding the list of items versus
+    printing one line again, and saving when nothing has changed.
+    Usage: bench_unread.py [channels] [items per channel]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from frsslib.RssDatabase import RssDatabase
+from frsslib.ChannelIndex import ChannelConfig
+
+class Client(object):
+    def __init__(self, names):
+        self.channels = []
+        for name in names:
+            conf = ChannelConfig(dict(
+                name=name, url=u'', get_full_text=False, show_title=True,
+                show_subtitle=True, history_length=10 ** 6, timeout=30.0,
+                refresh_interval=0.0))
+            self.channels.append({'conf': conf, 'unchanged': False,
+                                  'rss': {'feed': {}, 'items': []}})
+
+def make_db(path, channels, items):
+    rssc = Client([u'Channel %d' % i for i in range(channels)])
+    db = RssDatabase(path, rssc)
+    db.load()
+    for (c, ch) in enumerate(rssc.channels):
+        ch['rss']['items'] = [
+            {'title': u'Item %d' % i, 'summary': u'Summary %d %d' % (c, i),
+             'link': u'http://example.com/%d/%d' % (c, i), 'id': None}
+            for i in range(items)]
+    db.import_rss()
+    db.merge()
+    # Older items have been read already
+    for (k, items) in db.channels.items():
+        for item in items[len(items) // 10:]:
+            item.new = False
+        db.dirty_channels.add(k)
+    db.save()
+    db.conn.close()
+    return rssc
+
+def has_new_previous(db, name):
+    if db.channels.is_loaded(name):
+        return any(item.new for item in db.channels[name])
+    row = db.conn.execute('SELECT 1 FROM items WHERE channel = ? AND '
+                          'new = 1 LIMIT 1', (name,)).fetchone()
+    return row is not None
+
+def timed(fn, runs=20):
+    start = time.time()
+    for _ in range(runs):
+        fn()
+    return (time.time() - start) / runs
+
+def main():
+    channels = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    path = tempfile.mkdtemp()
+    try:
+        rssc = make_db(os.path.join(path, 'rss.db'), channels, items)
+        db = RssDatabase(os.path.join(path, 'rss.db'), rssc)
+        db.load()
+        names = [ch['conf'].name for ch in rssc.channels]
+        # Channels which have been opened in this session
+        for name in names[:channels // 2]:
+            db.channels[name]
+        flag = lambda n: [' ', '*'][n] + ' '
+        items0 = db.channels[names[0]]
+
+        print '%d channels, %d items each, half of them loaded' % (
+            channels, items)
+        for (name, fn) in (
+                ('channel list (previous)',
+                 lambda: [has_new_previous(db, k) for k in names]),
+                ('channel list (counters)',
+                 lambda: map(db.unread_counts().get, names)),
+                ('mark, whole list (previous)',
+                 lambda: (db.mark(names[0], items0[5], not items0[5].new),
+                          [flag(item.new) + item.title for item in items0])),
+                ('mark, one line',
+                 lambda: (db.mark(names[0], items0[5], not items0[5].new),
+                          flag(items0[5].new) + items0[5].title)),
+                ('save, nothing changed', db.save)):
+            print '  %-30s %8.3f ms' % (name, timed(fn) * 1000)
+        db.conn.close()
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares results of two runs of suite.py (e.g. two commits)
+    Usage: compare.py old.json new.json
+"""
+
+import sys
+import json
+
+def better(name, old, new):
+    """ Tells you whether the change is an improvement, None if it is not
+        known which direction is better
+    """
+    if name.endswith('_per_s'):
+        return new > old
+    if name.endswith(('_time', '_wall', '_ms_per_page', '_mb',
+                      '_chars_per_redraw')):
+        return new < old
+    return None
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1]) as f:
+        old = json.load(f)
+    with open(sys.argv[2]) as f:
+        new = json.load(f)
+
+    print '%-40s %12s %12s %8s' % ('%s -> %s' % (old['commit'], new['commit']),
+                                   'old', 'new', 'change')
+    for stage in sorted(set(old['stages']) & set(new['stages'])):
+        print stage
+        old_results = old['stages'][stage]
+        new_results = new['stages'][stage]
+        for name in sorted(set(old_results) & set(new_results)):
+            a = old_results[name]
+            b = new_results[name]
+            if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+                continue
+            change = '%+7.1f%%' % (100.0 * (b - a) / a) if a else '      -'
+            mark = {True: '+', False: '-', None: ''}[
+                better(name, a, b) if a != b else None]
+            print '  %-38s %12.3f %12.3f %s %s' % (name, a, b, change, mark)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Generates synthetic article pages: navigation, sidebars and adverts
+    around the article itself
+"""
+
+import random
+
+WORDS = (u'lorem ipsum dolor sit amet consectetur adipiscing elit sed do '
+         u'eiusmod tempor incididunt ut labore et dolore magna aliqua '
+         u'zażółć gęślą jaźń').split()
+
+# Layouts of the sites: ids and classes of the containers around the article
+SITES = [('main', 'article', 'content'),
+         ('page', 'post', 'entry-content'),
+         ('wrapper', 'story', 'story-body'),
+         ('container', 'news-item', 'text')]
+
+def _sentence(rnd, n):
+    return u' '.join(rnd.choice(WORDS) for _ in range(n)).capitalize() + u'.'
+
+def _paragraph(rnd):
+    parts = []
+    for _ in range(rnd.randint(3, 8)):
+        s = _sentence(rnd, rnd.randint(6, 16))
+        markup = rnd.random()
+        if markup < 0.1:
+            s = u'<a href="/link/%d">%s</a>' % (rnd.randint(0, 999), s)
+        elif markup < 0.15:
+            s = u'<strong>%s</strong>' % s
+        elif markup < 0.2:
+            s = u'<em>%s</em>' % s
+        elif markup < 0.25:
+            s = u'<b>%s</b>' % s
+        parts.append(s)
+    return u'<p>%s</p>\n' % u' '.join(parts)
+
+def page(seed, paragraphs=20, site=0):
+    """ Returns HTML page (utf-8 encoded) of an article
+    """
+    rnd = random.Random(seed)
+    main, container, content = SITES[site]
+    nav = u''.join(u'<li><a href="/section/%d">%s</a></li>' % (i, rnd.choice(WORDS))
+                   for i in range(30))
+    sidebar = u''.join(u'<div class="widget"><h3>%s</h3><a href="/%d">%s</a></div>'
+                       % (rnd.choice(WORDS), i, _sentence(rnd, 5))
+                       for i in range(15))
+    article = u''.join(_paragraph(rnd) for _ in range(paragraphs))
+    html = (u'<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+            u'<title>%s</title><script>var x = 1;</script>'
+            u'<style>body {color: black}</style></head><body>\n'
+            u'<div id="header"><ul class="nav">%s</ul></div>\n'
+            u'<div id="%s"><div class="%s">\n<h1><b>%s</b></h1>\n'
+            u'<div class="%s">\n%s</div></div>\n'
+            u'<div id="sidebar">%s</div></div>\n'
+            u'<div class="advert">Buy now!</div>\n'
+            u'<div id="footer">Copyright <a href="/about">About</a></div>\n'
+            u'</body></html>\n') % (_sentence(rnd, 6), nav, main, container,
+                                   _sentence(rnd, 6), content, article,
+                                   sidebar)
+    return html.encode('utf-8')
+
+def pages(count=50, paragraphs=20, site=0):
+    return [page(seed, paragraphs, site) for seed in range(count)]
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Headless stand-in for curses. Screen is kept in memory, keys are
+    scripted and everything that would be sent to the terminal is counted.
+    install() has to be called before CuiList is imported.
+"""
+
+import sys
+import locale
+
+A_STANDOUT = 1 << 16
+A_BOLD = 1 << 21
+
+class error(Exception):
+    pass
+
+class Screen:
+    """ Window returned by initscr()
+    """
+    def __init__(self, height=40, width=120, keys=()):
+        self.height = height
+        self.width = width
+        self.keys = list(keys)  # returned by getkey() one by one
+        self.cells = [[' '] * width for _ in range(height)]
+        self.y = 0
+        self.x = 0
+        self.attrs = 0
+        self.written = 0        # characters written, including cleared ones
+        self.refreshes = 0
+
+    def getmaxyx(self):
+        return (self.height, self.width)
+
+    def keypad(self, flag):
+        pass
+
+    def timeout(self, delay):
+        pass
+
+    def getkey(self):
+        if not self.keys:
+            raise error('no input')
+        return self.keys.pop(0)
+
+    def move(self, y, x):
+        self.y = y
+        self.x = x
+
+    def erase(self):
+        self.cells = [[' '] * self.width for _ in range(self.height)]
+        self.written += self.width * self.height
+
+    def clrtoeol(self):
+        row = self.cells[self.y]
+        row[self.x:] = [' '] * (self.width - self.x)
+        self.written += self.width - self.x
+
+    def addstr(self, y, x, text):
+        if y >= self.height or x + len(text) > self.width:
+            raise error('addstr() returned ERR')
+        self.cells[y][x:x + len(text)] = list(text)
+        self.y = y
+        self.x = x + len(text)
+        self.written += len(text)
+
+    def attron(self, attr):
+        self.attrs |= attr
+
+    def attroff(self, attr):
+        self.attrs &= ~attr
+
+    def noutrefresh(self):
+        self.refreshes += 1
+
+    def row(self, y):
+        return ''.join(self.cells[y]).rstrip()
+
+_screen = None
+
+def initscr():
+    return _screen
+
+def doupdate():
+    pass
+
+def noecho():
+    pass
+
+def echo():
+    pass
+
+def cbreak():
+    pass
+
+def nocbreak():
+    pass
+
+def start_color():
+    pass
+
+def curs_set(visibility):
+    pass
+
+def endwin():
+    pass
+
+def install(screen):
+    """ Makes 'import curses' import this module. 'screen' is returned by
+        initscr().
+    """
+    global _screen
+    _screen = screen
+    sys.modules['curses'] = sys.modules[__name__]
+
+    # Terminal encoding doesn't matter when there is no terminal, UTF-8
+    # locale may not be available
+    setlocale = locale.setlocale
+    def setlocale_or_ignore(category, name=None):
+        try:
+            return setlocale(category, name)
+        except locale.Error:
+            return None
+    locale.setlocale = setlocale_or_ignore
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Generates synthetic RSS/Atom feeds: any number of items with summaries
+    of given size
+"""
+
+import random
+from xml.sax.saxutils import escape
+
+from corpus import WORDS
+
+RSS = u"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>%(title)s</title>
+<description>Synthetic feed</description>
+%(items)s</channel></rss>
+"""
+RSS_ITEM = u"""<item><title>%(title)s</title><link>%(link)s</link>
+<description>%(summary)s</description></item>
+"""
+
+ATOM = u"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>%(title)s</title>
+<subtitle>Synthetic feed</subtitle>
+%(items)s</feed>
+"""
+ATOM_ITEM = u"""<entry><title>%(title)s</title><link href="%(link)s"/>
+<summary type="html">%(summary)s</summary></entry>
+"""
+
+def text(rnd, size):
+    """ Returns random text of about 'size' characters
+    """
+    words = []
+    length = 0
+    while length < size:
+        word = rnd.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return u' '.join(words)[:size]
+
+def items(channel, count, summary_size=500, first=0):
+    """ Returns items of a channel: dictionaries with title, link and
+        summary. Items are numbered from 'first', the newest first.
+    """
+    result = []
+    for i in range(first + count - 1, first - 1, -1):
+        # The same item is the same in every feed
+        rnd = random.Random('%d/%d' % (channel, i))
+        result.append({'title': u'%s %d' % (text(rnd, 40).capitalize(), i),
+                       'link': u'http://example.com/%d/%d' % (channel, i),
+                       'summary': u'<p>%s</p>' % text(rnd, summary_size)})
+    return result
+
+def feed(channel, count, summary_size=500, first=0, atom=False):
+    """ Returns feed (utf-8 encoded) of a channel with 'count' items
+    """
+    template, item_template = (ATOM, ATOM_ITEM) if atom else (RSS, RSS_ITEM)
+    body = u''.join(item_template % {k: escape(v) for (k, v) in item.items()}
+                    for item in items(channel, count, summary_size, first))
+    return (template % {'title': u'Channel %d' % channel,
+                        'items': body}).encode('utf-8')
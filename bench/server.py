@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import BaseHTTPServer
+import SocketServer
+import hashlib
+import threading
+import time
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1' # keep-alive
+    wbufsize = -1                 # headers and body in one packet
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        page = self.server.pages.get(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+
+        body, content_type, delay, length = page
+        time.sleep(delay)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('ETag', etag)
+        if length:
+            self.send_header('Content-Length', str(len(body)))
+        else:
+            # End of the body is the end of the connection
+            self.send_header('Connection', 'close')
+            self.close_connection = 1
+        self.end_headers()
+        # Bytes sent until the client closes the connection are counted
+        for start in range(0, len(body), 64 * 1024):
+            chunk = body[start:start + 64 * 1024]
+            self.wfile.write(chunk)
+            with self.server.lock:
+                self.server.sent += len(chunk)
+
+    def log_message(self, *args):
+        pass
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        pass # clients drop kept-alive connections at exit
+
+class LocalServer:
+    """ HTTP stand-in for feed and article hosts. Each page can be served
+        with an artificial delay.
+    """
+    def __init__(self):
+        self.httpd = _Server(('127.0.0.1', 0), _Handler)
+        self.httpd.pages = {}
+        self.httpd.lock = threading.Lock()
+        self.httpd.connections = 0 # opened by the clients
+        self.httpd.sent = 0        # bytes of the bodies
+        self.port = self.httpd.server_address[1]
+
+    def add(self, path, body, content_type='application/rss+xml', delay=0,
+            length=True):
+        """ Adds a page. If 'length' is False, Content-Length is not sent.
+        """
+        self.httpd.pages[path] = (body, content_type, delay, length)
+        return 'http://127.0.0.1:%d%s' % (self.port, path)
+
+    @property
+    def connections(self):
+        return self.httpd.connections
+
+    @property
+    def sent(self):
+        return self.httpd.sent
+
+    def start(self):
+        thread = threading.Thread(target=self.httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
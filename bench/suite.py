@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Benchmark suite covering every stage of the pipeline: refresh, merge,
+    save/load, full text extraction and UI redraw. Each stage runs in a
+    separate process, so that its peak memory can be measured. Results are
+    written as JSON and can be compared with compare.py.
+    Usage: suite.py [-o results.json] [--stages refresh,merge,...] [options]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import feeds
+import corpus
+
+STAGES = ('refresh', 'merge', 'save_load', 'search', 'extract', 'redraw')
+
+def channel_config(i, history_length):
+    from frsslib.ChannelIndex import ChannelConfig
+    return ChannelConfig(dict(name=u'Channel %d' % i, url=u'',
+                              get_full_text=False, show_title=True,
+                              show_subtitle=True,
+                              history_length=history_length, timeout=30.0,
+                              refresh_interval=0.0))
+
+def bench_refresh(args, path):
+    """ Downloads and parses all the channels, then once again (304)
+    """
+    from frsslib.RssClient import RssClient
+    from frsslib import Http, Stats
+    from server import LocalServer
+
+    # All the channels are served by one host
+    Http.configure(host_connections=args.workers)
+    server = LocalServer()
+    path_channels = os.path.join(path, 'channels')
+    os.mkdir(path_channels)
+    for i in range(args.channels):
+        url = server.add('/feed%d.xml' % i,
+                         feeds.feed(i, args.items, args.summary_size),
+                         delay=args.latency)
+        with open(os.path.join(path_channels, 'ch%d' % i), 'w') as f:
+            f.write('Name = Channel %d\nURL = %s\nHistoryLength = %d\n'
+                    % (i, url, args.items))
+    server.start()
+    Stats.enable()
+    try:
+        rssc = RssClient(path_channels)
+        rssc.read_config()
+        results = {}
+        for run in ('first', 'not_modified'):
+            start = time.time()
+            rssc.update_all(args.workers, args.workers,
+                            callback=lambda ch: None)
+            elapsed = time.time() - start
+            results[run + '_wall'] = elapsed
+            results[run + '_channels_per_s'] = args.channels / elapsed
+        totals = Stats.totals('channel')
+        results['bytes'] = totals.get('bytes', 0)
+        results['parse_time'] = totals.get('parse_time', 0)
+        results['failed'] = totals.get('failed', 0)
+    finally:
+        Http.close()
+        server.stop()
+    return results
+
+def _database(args, path):
+    """ Returns database with items of all the channels
+    """
+    from frsslib.RssDatabase import RssDatabase, Item
+
+    class Client:
+        channels = [{'conf': channel_config(i, args.history)}
+                    for i in range(args.channels)]
+
+    rssdb = RssDatabase(os.path.join(path, 'rss.db'), Client())
+    rssdb.load()
+    for i in range(args.channels):
+        name = u'Channel %d' % i
+        rssdb.channels[name] = [
+            Item(item['title'], item['link'], item['summary'], False)
+            for item in feeds.items(i, args.history, args.summary_size)]
+        rssdb.channels.names.add(name)
+        rssdb.dirty_channels.add(name)
+    return rssdb, Client()
+
+def bench_merge(args, path):
+    """ Merges feeds which have a few new items with the stored channels
+    """
+    from frsslib.RssDatabase import RssDatabase
+    rssdb, rssc = _database(args, path)
+    rssdb.save()
+    rssdb.conn.close()
+
+    # Feeds contain 'new' items which haven't been stored yet
+    new = max(1, args.items // 5)
+    for (i, ch) in enumerate(rssc.channels):
+        ch.update({'rss': {'feed': {'title': u'Channel %d' % i},
+                           'items': feeds.items(i, args.items,
+                                                args.summary_size,
+                                                args.history - args.items + new)},
+                   'unchanged': False})
+
+    rssdb = RssDatabase(os.path.join(path, 'rss.db'), rssc)
+    rssdb.load()
+    start = time.time()
+    rssdb.import_rss()
+    rssdb.merge()
+    merge_time = time.time() - start
+    dirty = len(rssdb.dirty_channels)
+    start = time.time()
+    rssdb.save()
+    save_time = time.time() - start
+    return {'merge_time': merge_time,
+            'merge_items_per_s': args.channels * args.items / merge_time,
+            'save_time': save_time,
+            'dirty_channels': dirty}
+
+def bench_save_load(args, path):
+    """ Saves all the channels, then opens the database and reads all the
+        items
+    """
+    from frsslib.RssDatabase import RssDatabase
+    rssdb, rssc = _database(args, path)
+    n_items = args.channels * args.history
+    start = time.time()
+    rssdb.save()
+    save_time = time.time() - start
+    rssdb.conn.close()
+
+    start = time.time()
+    rssdb = RssDatabase(os.path.join(path, 'rss.db'), rssc)
+    rssdb.load()
+    for ch in rssc.channels:
+        rssdb.channels[ch['conf'].name]
+    load_time = time.time() - start
+    start = time.time()
+    for ch in rssc.channels:
+        for item in rssdb.channels[ch['conf'].name]:
+            item.summary
+    summaries_time = time.time() - start
+    return {'items': n_items,
+            'save_time': save_time,
+            'save_items_per_s': n_items / save_time,
+            'load_time': load_time,
+            'load_items_per_s': n_items / load_time,
+            'summaries_per_s': n_items / summaries_time}
+
+def bench_search(args, path):
+    """ Builds the search index of all the items, loads it again and runs
+        queries which find many, a few and no items
+    """
+    from frsslib.RssDatabase import RssDatabase
+    rssdb, rssc = _database(args, path)
+    rssdb.save()
+    rssdb.conn.close()
+    n_items = args.channels * args.history
+    path_search = os.path.join(path, 'rss.search')
+
+    rssdb = RssDatabase(os.path.join(path, 'rss.db'), rssc, path_search)
+    rssdb.load()
+    start = time.time()
+    rssdb.load_search()
+    build_time = time.time() - start
+    rssdb.save()
+    rssdb.conn.close()
+
+    rssdb = RssDatabase(os.path.join(path, 'rss.db'), rssc, path_search)
+    rssdb.load()
+    start = time.time()
+    rssdb.load_search()
+    load_time = time.time() - start
+
+    item = feeds.items(args.channels // 2, 1, 0, args.history // 2)[0]
+    results = {'items': n_items,
+               'build_items_per_s': n_items / build_time,
+               'load_time': load_time,
+               'index_mb': os.path.getsize(path_search) / 1024.0 / 1024}
+    for (name, query) in (('common', item['title'].split()[0]),
+                          ('title', item['title']),
+                          ('prefix', item['title'].split()[0][:3] + '*'),
+                          ('missing', u'nonexistent')):
+        start = time.time()
+        found = rssdb.search.search(query)
+        results[name + '_query_ms'] = 1000 * (time.time() - start)
+        results[name + '_found'] = len(found)
+    return results
+
+def bench_extract(args, path):
+    """ Downloads article pages and extracts their text
+    """
+    from frsslib.WwwReader import WwwReader
+    from frsslib import Http, Stats
+    from server import LocalServer
+    server = LocalServer()
+    urls = [server.add('/article%d.html' % i, html, 'text/html')
+            for (i, html) in enumerate(corpus.pages(args.pages))]
+    server.start()
+    Stats.enable()
+    try:
+        wr = WwwReader(verbose=False)
+        start = time.time()
+        for url in urls:
+            wr.read(url)
+        elapsed = time.time() - start
+    finally:
+        Http.close()
+        server.stop()
+
+    results = {'pages_per_s': args.pages / elapsed}
+    totals = Stats.totals('fulltext')
+    for stage in ('download', 'extract', 'html2text'):
+        results[stage + '_ms_per_page'] = \
+            1000 * totals.get(stage + '_time', 0) / args.pages
+    return results
+
+def bench_redraw(args, path):
+    """ Moves the cursor up and down, scrolls the list of items and redraws
+        the whole screen (resize)
+    """
+    import fakecurses
+    moves = args.redraws
+    results = {}
+    for (name, keys) in (('move', ['KEY_DOWN', 'KEY_UP'] * (moves // 2)),
+                         ('scroll', ['KEY_DOWN'] * moves),
+                         ('full', ['KEY_RESIZE'] * moves)):
+        screen = fakecurses.Screen(40, 120, keys + ['q'])
+        fakecurses.install(screen)
+        from frsslib.CuiList import CuiList, Bold
+
+        cui = CuiList()
+        cui.header = [Bold(u'Channel title'), u'Subtitle', u'']
+        cui.items = [u'* ' + item['title']
+                     for item in feeds.items(0, moves + 100, 0)]
+        cui.register_cb('key_pressed', lambda key: key == 'q')
+        start = time.time()
+        cui.display()
+        elapsed = time.time() - start
+        results[name + '_per_s'] = len(keys) / elapsed
+        results[name + '_chars_per_redraw'] = screen.written / float(len(keys))
+    return results
+
+def run_stage(stage, args):
+    """ Runs stage in a child process, returns its results, CPU time and
+        peak memory
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        path = tempfile.mkdtemp()
+        try:
+            if stage is None:
+                results = {} # only memory of the process is measured
+            else:
+                results = globals()['bench_' + stage](args, path)
+            data = json.dumps(results)
+        except Exception as e:
+            data = json.dumps({'error': repr(e)})
+        finally:
+            shutil.rmtree(path)
+        with os.fdopen(write_fd, 'w') as f:
+            f.write(data)
+        os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        results = json.loads(f.read() or '{}')
+    _, _, usage = os.wait4(pid, 0)
+    results['cpu_time'] = usage.ru_utime + usage.ru_stime
+    results['peak_rss_kb'] = usage.ru_maxrss
+    return results
+
+def commit():
+    """ Returns commit which is benchmarked (if it can be found out)
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-o', '--output', help='write results to this file (JSON)')
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma separated stages: ' + ', '.join(STAGES))
+    parser.add_argument('--channels', type=int, default=100, help='number of channels')
+    parser.add_argument('--items', type=int, default=30, help='items in each feed')
+    parser.add_argument('--history', type=int, default=100, help='items stored for each channel')
+    parser.add_argument('--summary-size', type=int, default=500, help='characters in each summary')
+    parser.add_argument('--latency', type=float, default=0.05, help='delay of the feed server [s]')
+    parser.add_argument('--workers', type=int, default=8, help='channels updated at the same time')
+    parser.add_argument('--pages', type=int, default=30, help='article pages to be extracted')
+    parser.add_argument('--redraws', type=int, default=2000, help='cursor moves and full redraws')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    stages = [stage for stage in args.stages.split(',') if stage]
+    for stage in stages:
+        if stage not in STAGES:
+            sys.exit('Unknown stage: ' + stage)
+
+    baseline = run_stage(None, args)['peak_rss_kb']
+    results = {'commit': commit(),
+               'time': time.time(),
+               'python': platform.python_version(),
+               'params': vars(args),
+               'stages': {}}
+    for stage in stages:
+        sys.stderr.write('%s...\n' % stage)
+        stage_results = run_stage(stage, args)
+        stage_results['peak_rss_mb'] = \
+            (stage_results.pop('peak_rss_kb') - baseline) / 1024.0
+        results['stages'][stage] = stage_results
+        for name in sorted(stage_results):
+            value = stage_results[name]
+            if isinstance(value, float):
+                value = '%.3f' % value
+            sys.stderr.write('  %-28s %s\n' % (name, value))
+
+    data = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(data + '\n')
+    else:
+        print data
+
+if __name__ == '__main__':
+    main()
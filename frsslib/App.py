@@ -4,42 +4,113 @@
 import os
 from os.path import expanduser, join
 import argparse
+import fcntl
+import Queue
+import time
 from textwrap import dedent
 
 from CuiList import CuiList, Bold
 from RssClient import RssClient
-from Pager import pager
-from WwwReader import WwwReader
+from ChannelIndex import ConfigError
+from Pager import less, Rendering, RenderCache
+from CuiPager import CuiPager
 from RssDatabase import RssDatabase
+from Settings import read_settings
+from TextCache import TextCache
+from Prefetcher import Prefetcher
+from BatchReader import BatchReader
+from Export import open_export
+from Templates import Templates
+from Scheduler import Scheduler
+import Http
+import Stats
+
+MAX_RESULTS = 1000 # items listed by search, the newest ones
 
 def have_new_items(rssc, rssdb):
     """ Tells you which channel has new items
     """
-    new = [any([chdb['new'] for chdb in rssdb.channels[ch['conf']['Name']]])
-           for ch in rssc.channels]
-    return new
+    counts = rssdb.unread_counts()
+    return [counts.get(ch['conf'].name, 0) > 0 for ch in rssc.channels]
                
 def print_channels(cui, rssc, rssdb):
-    """ Prints the list of channels
+    """ Prints the list of channels with the numbers of unread items
     """
     cui.header = []
     
-    # Channels that have unread items
-    new = have_new_items(rssc, rssdb)
+    # Numbers of unread items are kept up to date by the database
+    counts = rssdb.unread_counts()
+    unread = [counts.get(ch['conf'].name, 0) for ch in rssc.channels]
     
     # Channels which couldn't be updated
     broken = [ch['broken'] for ch in rssc.channels]
     
-    flag = lambda n, b: [[' ', '*'][n], '!'][b] + ' '
-    cui.items = [flag(n,b) + ch['conf']['Name']
-                 for (n, b, ch) in zip(new, broken, rssc.channels)]
+    flag = lambda n, b: [[' ', '*'][n > 0], '!'][b] + ' '
+    count = lambda n: u' (%d)' % n if n else u''
+    cui.items = [flag(n,b) + ch['conf'].name + count(n)
+                 for (n, b, ch) in zip(unread, broken, rssc.channels)]
+
+def displayed_items(rssc, rssdb, app):
+    """ Returns (channel configuration, item) of the items which are
+        displayed: items of selected channel or search results
+    """
+    if app.search is not None:
+        return app.search
+    conf = rssc.channels[app.ch_selection]['conf']
+    return [(conf, item) for item in rssdb.channels[conf.name]]
+
+def selected_item(cui, rssc, rssdb, app):
+    """ Returns (channel configuration, item) of the selected item or None
+        if no item is selected
+    """
+    if app.search is not None:
+        items = app.search
+    else:
+        conf = rssc.channels[app.ch_selection]['conf']
+        items = rssdb.channels[conf.name]
+    if cui.selection >= len(items):
+        return None
+    if app.search is not None:
+        return items[cui.selection]
+    return (conf, items[cui.selection])
+
+def search(cui, rssc, rssdb, app):
+    """ Asks for a query and displays items of all the channels which
+        contain all the words of the query (as a virtual channel)
+    """
+    query = cui.read_line(u'/')
+    if not query:
+        return
+    confs = {ch['conf'].name: ch['conf'] for ch in rssc.channels}
+    app.search = [(confs[k], item)
+                  for (k, item) in rssdb.find(query, MAX_RESULTS)
+                  if k in confs]
+    app.query = query
+    if app.level == 0:
+        app.ch_selection = cui.selection
+    app.level = 1
+    cui.selection = 0
+    cui.scroll = 0
+    stop_prefetching(app)
+    print_items(cui, rssc, rssdb, app)
+
+def print_results(cui, app):
+    """ Prints the list of items which have been found
+    """
+    cui.header = [Bold(u'Search: ' + app.query),
+                  u'%d items found' % len(app.search), u'']
+    cui.items = [item_line(conf, item, app) for (conf, item) in app.search]
 
 def print_items(cui, rssc, rssdb, app):
     """ Prints the list of items for selected channel
     """
+    if app.search is not None:
+        print_results(cui, app)
+        return
+
     ch = rssc.channels[app.ch_selection] # Selected channel
     conf = ch['conf']
-    items = rssdb.channels[conf['Name']]
+    items = rssdb.channels[conf.name]
     
     cui.header = []
     
@@ -47,11 +118,11 @@ def print_items(cui, rssc, rssdb, app):
     # (they may not exist if channel hasn't been updated)
     if ch['rss'].has_key('feed'):
         feed = ch['rss']['feed']
-        if int(conf['ShowTitle']):
+        if conf.show_title:
             if feed.has_key('title'):
                 cui.header.append(Bold(feed['title']))
             
-        if int( conf['ShowSubtitle']):
+        if conf.show_subtitle:
             if feed.has_key('subtitle'):
                 cui.header.append(feed['subtitle'])
         
@@ -59,23 +130,122 @@ def print_items(cui, rssc, rssdb, app):
     if len(cui.header):
         cui.header.append('')
     
-    flag = lambda n: [' ', '*'][n] + ' '
-    cui.items = [flag(item['new']) + item['title'] for item in items]
+    cui.items = [item_line(conf, item, app) for item in items]
+
+    # Download full text of unread items in the background, starting from the
+    # top of the list
+    if app.prefetcher and conf.get_full_text:
+        app.prefetcher.start(conf.name, unread_articles(items, app))
 
-def print_content(conf, cui, items):
-    """ Prints content of an item
+def item_line(conf, item, app):
+    """ Returns line of the list of items which describes an item
     """
-    if int(conf['GetFullText']):
-        url = items[cui.selection]['link']
-        wr = WwwReader()
-        try:
-            text = wr.read(url)
-        except:
-            text = 'Content cannot accessed.'
+    line = [u'  ', u'* '][item.new] + item.title
+    if app.search is not None:
+        line += u' [' + conf.name + u']'
+    return line
+
+def update_item(cui, rssc, rssdb, app):
+    """ Prints again selected item after its flag has changed. Other items
+        of the list are printed again only if they are the same article
+        (search results).
+    """
+    (conf, selected) = selected_item(cui, rssc, rssdb, app)
+    if app.search is None:
+        cui.items[cui.selection] = item_line(conf, selected, app)
+        return
+    for (i, (conf, item)) in enumerate(app.search):
+        if item.article == selected.article:
+            cui.items[i] = item_line(conf, item, app)
+
+def unread_articles(items, app):
+    """ Returns links of unread articles whose full text is not cached.
+        Article which is published by a few channels is downloaded once.
+    """
+    urls = []
+    for item in items:
+        if item.new and item.article not in urls and \
+                not app.cache.has(item.article):
+            urls.append(item.article)
+    return urls
+
+def stop_prefetching(app):
+    """ Stops downloading full text in the background. Texts which are
+        ready are moved to the cache.
+    """
+    if app.prefetcher:
+        app.prefetcher.cancel()
+        for (url, text) in app.prefetcher.pop_all().items():
+            cache_text(app, url, text)
+
+def cache_text(app, url, text):
+    """ Puts full text to the cache and optionally to the search index
+    """
+    app.cache.put(url, text)
+    if int(app.settings['SearchFullText']):
+        app.rssdb.index_text(url, text)
+
+def read_content(conf, item, cui, app):
+    """ Returns content of an item (UTF-8) and tells you whether it has
+        been read (otherwise the content is a message about the failure)
+    """
+    cache = app.cache
+    if conf.get_full_text:
+        url = item.article # the same for duplicates in other channels
+        text = app.prefetcher.pop(url) if app.prefetcher else None
+        if text is not None:
+            cache_text(app, url, text)
+            Stats.add('fulltext', url, prefetched=1)
+        else:
+            text = cache.get(url)
+            if text is not None:
+                Stats.add('fulltext', url, cache_hits=1)
+        if text is None:
+            Stats.add('fulltext', url, cache_misses=1)
+            # Imported when it is needed for the first time, it takes a while
+            from WwwReader import WwwReader
+            if app.builtin_pager:
+                # Progress is displayed by CUI
+                cui.print_message(u'Downloading full text...')
+            wr = WwwReader(not app.builtin_pager, app.templates)
+            try:
+                text = wr.read(url)
+            except Http.PageError as e:
+                return 'Content cannot be accessed. %s.' % e, False
+            except:
+                return 'Content cannot accessed.', False
+            cache_text(app, url, text)
     else:
-        text = items[cui.selection]['summary'].encode('utf-8')
-    
-    pager(text, cui.display_width)
+        text = item.summary.encode('utf-8')
+    return text, True
+
+def print_content(conf, item, cui, app):
+    """ Prints content of an item. Text wrapped for the width of the screen
+        is cached, so it is displayed at once when the item is opened again.
+    """
+    if conf.get_full_text:
+        key = ('fulltext', item.article)
+    else:
+        key = ('summary', conf.name, item.key)
+
+    def render(width):
+        rendering = app.renderings.get(key, width)
+        if rendering is None:
+            text, ok = read_content(conf, item, cui, app)
+            if not ok:
+                # Download is tried again when the item is opened again
+                return Rendering(text, width)
+            rendering = app.renderings.put(key, text, width)
+        return rendering
+
+    if app.builtin_pager:
+        CuiPager(cui).display(render)
+    else:
+        # 'less' takes over the terminal
+        cui.disable_curses()
+        less(render(cui.display_width))
+        cui.enable_curses()
+        cui.setup_curses()
 
 def key_pressed_cb(key, cui, rssc, rssdb, app):
     """ This callback is called by CUI when a key is pressed
@@ -86,41 +256,225 @@ def key_pressed_cb(key, cui, rssc, rssdb, app):
         app.level += 1             # Go one level further
         if app.level == 1:         # Items
             app.ch_selection = cui.selection
+            app.search = None
             cui.selection = 0
             print_items(cui, rssc, rssdb, app)            
 
         elif app.level == 2:       # Item's content
-            conf = rssc.channels[app.ch_selection]['conf']
-            items = rssdb.channels[conf['Name']]
-            items[cui.selection]['new'] = False # Mark as read
-            cui.disable_curses()
-            print_content(conf, cui, items)            
+            selected = selected_item(cui, rssc, rssdb, app)
+            if selected is None:   # nothing to be displayed
+                app.level = 1
+                return
+            (conf, item) = selected
+            rssdb.mark(conf.name, item, False) # Mark as read
+            print_content(conf, item, cui, app)
             # Restore list of items
-            cui.enable_curses()
-            cui.setup_curses()
             app.level = 1
-            print_items(cui, rssc, rssdb, app)
+            update_item(cui, rssc, rssdb, app)
     elif key in ['q', 'KEY_LEFT', 'KEY_BACKSPACE']:
         app.level -= 1              # Go one level back
         if app.level == -1:         # Quit
             return True             # Exit CUI
         elif app.level == 0:        # Channels
+            app.search = None
+            stop_prefetching(app)
             print_channels(cui, rssc, rssdb)
             cui.selection = app.ch_selection
     elif key in [' ', 'm']:         # Mark item as read/unread
-        if app.level == 1:
-            conf = rssc.channels[app.ch_selection]['conf']
-            items = rssdb.channels[conf['Name']]
-            items[cui.selection]['new'] = not items[cui.selection]['new']
-            print_items(cui, rssc, rssdb, app)
+        selected = selected_item(cui, rssc, rssdb, app) \
+                   if app.level == 1 else None
+        if selected is not None:
+            (conf, item) = selected
+            rssdb.mark(conf.name, item, not item.new)
+            update_item(cui, rssc, rssdb, app)
     elif key in ['A']:              # Mark all items as read/unread
         if app.level == 1:   
-            conf = rssc.channels[app.ch_selection]['conf']
-            items = rssdb.channels[conf['Name']]
-            new = [item['new'] for item in items]
+            items = displayed_items(rssc, rssdb, app)
+            new = [item.new for (conf, item) in items]
             val = not any(new)
-            for item in items: item['new'] = val
+            for (conf, item) in items: rssdb.mark(conf.name, item, val)
             print_items(cui, rssc, rssdb, app)
+    elif key in ['/']:              # Search items of all the channels
+        if app.level in [0, 1]:
+            search(cui, rssc, rssdb, app)
+
+def start_update(rssc, app, channels):
+    """ Starts updating channels in the background. Updated channels are
+        put into app.updates.
+    """
+    rssc.update_all(int(app.settings['Workers']),
+                    int(app.settings['HostWorkers']),
+                    channels, callback=app.updates.put, wait=False)
+
+def merge_updates(rssc, rssdb, app):
+    """ Merges channels updated in the background with the database.
+        Returns the list of merged channels.
+    """
+    updated = []
+    while True:
+        try:
+            updated.append(app.updates.get_nowait())
+        except Queue.Empty:
+            break
+
+    if updated:
+        merge_channels(rssc, rssdb, app, updated)
+    return updated
+
+def merge_channels(rssc, rssdb, app, channels):
+    """ Merges updated channels with the database and schedules their next
+        refresh
+    """
+    rssdb.import_rss(channels)
+    rssdb.merge()
+    for ch in channels:
+        app.scheduler.done(ch, rssdb.added.get(ch['conf'].name, 0))
+    rssdb.save()
+    rssdb.save_schedule(app.scheduler.channels)
+    rssc.accept_validators(channels)
+    rssc.save_validators()
+
+def restore_feeds(rssc, app):
+    """ Title & subtitle of the channels which are not refreshed are taken
+        from the previous sessions
+    """
+    for ch in rssc.channels:
+        feed = app.scheduler.feed(ch)
+        if feed:
+            ch['rss'] = {'feed': feed, 'items': []}
+
+def idle_cb(cui, rssc, rssdb, app):
+    """ This callback is called by CUI when no key has been pressed for a
+        while. It refreshes channels and displays the changes.
+    """
+    # Refresh channels according to their RefreshInterval
+    due = app.scheduler.due(rssc.channels)
+    if due:
+        start_update(rssc, app, due)
+
+    # Selected item should stay selected when the list of items changes
+    ch = None
+    if app.level == 1 and app.search is None:
+        ch = rssc.channels[app.ch_selection]
+    selected = None
+    if ch is not None:
+        items = rssdb.channels[ch['conf'].name]
+        if cui.selection < len(items):
+            selected = items[cui.selection].key
+
+    updated = merge_updates(rssc, rssdb, app)
+    if not updated:
+        return
+
+    if app.level == 0:
+        print_channels(cui, rssc, rssdb)
+    elif any(upd is ch for upd in updated):
+        print_items(cui, rssc, rssdb, app)
+        keys = [item.key for item in rssdb.channels[ch['conf'].name]]
+        if selected in keys:
+            shift = keys.index(selected) - cui.selection
+            cui.selection += shift
+            cui.scroll = max(0, cui.scroll + shift)
+        else:
+            cui.selection = min(cui.selection, max(0, len(keys) - 1))
+
+def refresh(rssc, rssdb, app, channels):
+    """ Updates the channels and merges them with the database
+    """
+    rssc.update_all(int(app.settings['Workers']),
+                    int(app.settings['HostWorkers']), channels)
+    merge_channels(rssc, rssdb, app, channels)
+
+def batch_reader(app):
+    """ Returns reader of full text in bulk, which uses all the cores
+    """
+    return BatchReader(int(app.settings['ExtractWorkers']),
+                       int(app.settings['Workers']), app.templates)
+
+def prewarm_cache(rssc, rssdb, app, channels):
+    """ Downloads full text of unread items to the cache, so that it is
+        ready when the items are opened
+    """
+    urls = []
+    for ch in channels:
+        conf = ch['conf']
+        if conf.get_full_text:
+            urls.extend(url for url
+                        in unread_articles(rssdb.channels[conf.name], app)
+                        if url not in urls)
+    for (url, text) in batch_reader(app).read(urls):
+        if text is not None:
+            cache_text(app, url, text)
+
+def export_unread(rssc, rssdb, app, path):
+    """ Writes content of unread items to a directory or a file (see
+        open_export). Full text which is not cached is downloaded.
+    """
+    export = open_export(path)
+    exported = failed = 0
+    missing = {} # article -> (channel name, item) waiting for full text
+    try:
+        for ch in rssc.channels:
+            conf = ch['conf']
+            for item in rssdb.channels[conf.name]:
+                if not item.new:
+                    continue
+                if not conf.get_full_text:
+                    text = item.summary.encode('utf-8')
+                else:
+                    text = app.cache.get(item.article)
+                    if text is None:
+                        missing.setdefault(item.article, []).append(
+                            (conf.name, item))
+                        continue
+                export.write(conf.name, item, text)
+                exported += 1
+
+        # Texts are written as soon as they are ready
+        for (url, text) in batch_reader(app).read(missing):
+            if text is None:
+                failed += len(missing[url])
+                continue
+            cache_text(app, url, text)
+            for (name, item) in missing[url]:
+                export.write(name, item, text)
+                exported += 1
+    finally:
+        export.close()
+    print 'Exported %d items to %s' % (exported, path)
+    if failed:
+        print 'Full text of %d items cannot be accessed' % failed
+
+def run_headless(rssc, rssdb, app, once):
+    """ Refreshes channels without CUI. If 'once' is False, channels are
+        refreshed according to the schedule until CTRL+C is pressed.
+    """
+    while True:
+        due = app.scheduler.due(rssc.channels, force=app.args.force)
+        if due:
+            refresh(rssc, rssdb, app, due)
+            prewarm_cache(rssc, rssdb, app, due)
+            app.templates.save()
+
+        if once:
+            return
+        report_stats(app)
+
+        # Sleep in short periods, so that the schedule is checked regularly
+        wait = app.scheduler.wait_time()
+        time.sleep(60 if wait is None else min(max(wait, 1), 60))
+
+def report_stats(app):
+    """ Prints statistics and/or writes them to the metrics file, then
+        starts collecting them again
+    """
+    if app.args.stats:
+        report = Stats.report()
+        if report:
+            print report
+    if app.args.metrics:
+        Stats.write(app.args.metrics)
+    Stats.reset()
 
 class App:
     
@@ -134,6 +488,19 @@ class App:
         #  2 - Content of an item
         self.level = 0        # CUI level
         self.ch_selection = 0 # Currently selected channel
+        self.cache = None     # Full text cache
+        self.templates = None # Content containers learned per host
+        self.prefetcher = None # Downloads full text in the background
+        self.settings = None
+        self.args = None
+        self.rssdb = None     # RSS database
+        self.renderings = RenderCache() # texts wrapped for the screen
+        self.builtin_pager = False # text is displayed by CUI, not by less
+        self.search = None    # (channel configuration, item) of the items
+                              # which have been found, None - no search
+        self.query = u''      # text which has been searched for
+        self.updates = Queue.Queue() # channels updated in the background
+        self.scheduler = Scheduler() # decides when channels are refreshed
 
     def parse_args(self):
         """ Parses args of the application
@@ -153,6 +520,63 @@ class App:
         ShowTitle      = 1
         ShowSubtitle   = 1
         HistoryLength  = 15
+        Timeout        = 30   (seconds, for the server to respond and for
+                               the whole feed to be downloaded)
+        RefreshInterval= 0    (minutes, 0 - refresh at start when it is due)
+        
+        Global settings can be placed in ~/.frss/config
+        Example:
+            
+        Workers        = 8
+        HostWorkers    = 2
+        HttpTimeout    = 10   (full text download timeout in seconds)
+        HttpRetries    = 2
+        HostConnections= 4    (connections kept alive for each host)
+        MaxPageSize    = 5    (full text of larger pages is not read, in MB)
+        CacheSize      = 50   (full text cache size in MB)
+        CacheTTL       = 30   (full text cache validity in days)
+        Prefetch       = 0    (download full text in the background)
+        PrefetchWorkers= 2
+        PrefetchMemory = 20   (memory for prefetched text in MB)
+        SearchFullText = 0    (search also full text which has been downloaded)
+        BuiltinPager   = 0    (display text in frss instead of less)
+        ExtractWorkers = 0    (processes extracting full text in --daemon,
+                               --refresh-only and --export modes,
+                               0 - number of CPUs)
+        DaemonInterval = 30   (minimum refresh interval in --daemon mode in
+                               minutes, if RefreshInterval of the channel
+                               is 0)
+        _______________________________________________________________________
+
+        Refresh schedule
+
+        Channels whose RefreshInterval is 0 are refreshed about twice within
+        the interval in which they publish new items (between 15 minutes and
+        a day). Channels are not refreshed sooner than their servers ask for
+        (Cache-Control, Expires, Retry-After) or than the feed asks for (ttl,
+        skipHours, skipDays). Channels which are not due are not refreshed at
+        start; --force refreshes all of them.
+        
+        Headless mode
+
+        --daemon refreshes the channels according to their RefreshInterval
+        and downloads full text of unread items (if GetFullText = 1) to the
+        cache. It can run at the same time as interactive sessions.
+        --refresh-only does the same once and exits. Both are suitable for
+        cron or systemd.
+        --export PATH refreshes the channels and writes the unread items to
+        a directory (one file for each item), a mailbox (*.mbox) or a JSON
+        lines file (*.jsonl). Full text (if GetFullText = 1) which is not
+        in the cache is downloaded and extracted by ExtractWorkers processes.
+        _______________________________________________________________________
+        
+        Diagnostics
+        
+        --stats shows where the time is spent (download, parsing, merge, save,
+        full text download & extraction), downloaded bytes, new items, cache
+        hits etc. --metrics FILE appends the same as JSON lines (in --daemon
+        mode after every refresh). --profile FILE writes cProfile data which
+        can be viewed by: python -m pstats FILE
         _______________________________________________________________________
         
         Key bindings
@@ -161,6 +585,15 @@ class App:
         BACKSPACE, LEFT, q - Go back or exit
         SPACE, m           - Mark item as read/unread
         A                  - Mark all items as read/unread
+        /                  - Search items of all the channels (words ending
+                             with * are prefixes)
+
+        Builtin pager (BuiltinPager = 1)
+
+        UP, DOWN, j, k     - Scroll by one line
+        PGUP, PGDN, b, f, SPACE - Scroll by one page
+        HOME, END, g, G    - Go to the beginning or end of the text
+        BACKSPACE, LEFT, q - Go back
         _______________________________________________________________________
         
         """)
@@ -168,14 +601,40 @@ class App:
         parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawTextHelpFormatter)
         parser.add_argument('-u', '--no-update', action='store_true', help='don\'t update channels')
         parser.add_argument('-x', '--exit', action='store_true', help='exit if there is nothing new')
+        parser.add_argument('-f', '--force', action='store_true', help='refresh all channels, even if they are not due')
+        parser.add_argument('-j', '--jobs', type=int, help='number of channels updated at the same time')
+        parser.add_argument('--daemon', action='store_true', help='refresh channels periodically without CUI')
+        parser.add_argument('--refresh-only', action='store_true', help='refresh channels once without CUI and exit')
+        parser.add_argument('--export', metavar='PATH', help='write full text of unread items to PATH and exit:\ndirectory, *.mbox or *.jsonl file')
+        parser.add_argument('--stats', action='store_true', help='show timings and counters of downloads, parsing etc. at exit')
+        parser.add_argument('--metrics', metavar='FILE', help='append timings and counters to FILE (JSON lines)')
+        parser.add_argument('--profile', metavar='FILE', help='profile the main thread, write pstats dump to FILE')
+        parser.add_argument('--cache-stats', action='store_true', help='show statistics of the full text cache and exit')
         parser.add_argument('-V', '--version', action='store_true', help='show version number and exit')
         return parser.parse_args()
 
     def main(self):
         """ Main function of this application
         """
-        args = self.parse_args()
-        
+        args = self.args = self.parse_args()
+        if args.stats or args.metrics:
+            Stats.enable()
+
+        if args.profile:
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                profiler.runcall(self.run, args)
+            finally:
+                profiler.dump_stats(args.profile)
+        else:
+            self.run(args)
+
+        report_stats(self)
+
+    def run(self, args):
+        """ Runs the application with given args
+        """
         if args.version:
             print 'FRSS v' + str(self.app_version)
             return
@@ -185,24 +644,114 @@ class App:
         dir_channels = 'channels'
         path_channels = join(path_config, dir_channels)
         path_db = join(path_config, 'rss.db')
+        path_search = join(path_config, 'rss.search')
+        path_validators = join(path_config, 'rss.validators')
+        path_index = join(path_config, 'channels.index')
+        path_settings = join(path_config, 'config')
+        path_cache = join(path_config, 'fulltext.db')
+        path_templates = join(path_config, 'fulltext.templates')
+        path_lock = join(path_config, 'daemon.lock')
         if not os.path.exists(path_channels):
             os.makedirs(path_channels)
     
+        settings = self.settings = read_settings(path_settings)
+        if args.jobs:
+            settings['Workers'] = args.jobs
+
+        Http.configure(float(settings['HttpTimeout']),
+                       int(settings['HttpRetries']),
+                       int(settings['HostConnections']),
+                       int(float(settings['MaxPageSize']) * 1024 * 1024))
+
+        self.cache = TextCache(path_cache,
+                               int(settings['CacheSize']) * 1024 * 1024,
+                               int(settings['CacheTTL']) * 24 * 3600)
+
+        self.templates = Templates(path_templates)
+        self.templates.load()
+
+        self.builtin_pager = bool(int(settings['BuiltinPager']))
+
+        if int(settings['Prefetch']):
+            self.prefetcher = Prefetcher(
+                int(settings['PrefetchWorkers']),
+                int(settings['PrefetchMemory']) * 1024 * 1024,
+                self.templates)
+
+        if args.cache_stats:
+            stats = self.cache.stats()
+            print 'Entries: %(entries)d' % stats
+            print 'Size:    %.1f MB' % (stats['size'] / 1024.0 / 1024.0)
+            print 'Hits:    %(hits)d' % stats
+            print 'Misses:  %(misses)d' % stats
+            return
+
         # RSS client reads config files
-        rssc = RssClient(path_channels)
-        rssc.read_config()
+        rssc = RssClient(path_channels, path_validators, path_index)
+        try:
+            rssc.read_config()
+        except ConfigError as e:
+            print e
+            return
 
         # Database is restored from the file
-        rssdb = RssDatabase(path_db, rssc)
+        rssdb = self.rssdb = RssDatabase(path_db, rssc, path_search)
         rssdb.load()
+
+        # Channels are refreshed when they are due according to the schedule
+        # of the previous sessions
+        schedule = rssdb.load_schedule()
+        self.scheduler = Scheduler(schedule=schedule)
+        restore_feeds(rssc, self)
+
+        if args.daemon or args.refresh_only:
+            # Only one headless session at a time, interactive sessions are
+            # allowed anyway
+            lock = open(path_lock, 'w')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                print 'Another headless session is running'
+                return
+
+            rssc.load_validators()
+            rssc.keep_validators(rssdb.channels)
+            self.scheduler = Scheduler(int(settings['DaemonInterval']) * 60,
+                                       schedule=schedule)
+            # Search index is kept up to date for interactive sessions
+            rssdb.load_search()
+            try:
+                run_headless(rssc, rssdb, self, args.refresh_only)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self.cache.close()
+                self.templates.save()
+                lock.close()
+            return
         
         # RSS Client updates data which is merged with the content of Database
         if not args.no_update:
-            rssc.update_all()
-            rssdb.import_rss()
-            rssdb.merge()
-            rssdb.save()
+            rssc.load_validators()
+            rssc.keep_validators(rssdb.channels)
+            due = self.scheduler.due(rssc.channels, force=args.force)
+            if args.exit or args.export:
+                # Channels have to be updated to tell if there is anything new
+                refresh(rssc, rssdb, self, due)
+            elif due:
+                # Channels are updated while CUI is displayed
+                start_update(rssc, self, due)
     
+        if args.export:
+            try:
+                export_unread(rssc, rssdb, self, args.export)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self.cache.close()
+                self.templates.save()
+            return
+
         # Nothing to be done if all the items are already read
         if args.exit:
             if not any(have_new_items(rssc, rssdb)):
@@ -212,18 +761,25 @@ class App:
         # Create and configure CUI
         cui = CuiList()   
         cui.register_cb('key_pressed', key_pressed_cb, [cui, rssc, rssdb, self])
+        if not args.no_update:
+            cui.idle_timeout = 500
+            cui.register_cb('idle', idle_cb, [cui, rssc, rssdb, self])
 
         # Print list of channels
         print_channels(cui, rssc, rssdb)
         
         # Infinite while loop:
         # - displays CUI
-        # - waits for the key
+        # - waits for the key or for the updates
         # - handles the key and calls callback
         cui.display()
         
         # Save database to the file
+        merge_updates(rssc, rssdb, self)
         rssdb.save()
+        stop_prefetching(self)
+        self.cache.close()
+        self.templates.save()
 
 
 
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import threading
+from urlparse import urlparse
+import Queue
+import time
+import Http
+import Stats
+
+_reader = None # WwwReader of a worker process
+
+def _init(selectors):
+    # Every process imports readability once and starts with the templates
+    # learned so far
+    global _reader
+    from WwwReader import WwwReader
+    from Templates import Templates
+    _reader = WwwReader(False, Templates(selectors=selectors))
+
+def _extract(url, html, content_type):
+    """ Extracts text of the page in a worker process. Returns (url, text,
+        extract time, html2text time, template of the host), text is None
+        if it cannot be extracted.
+    """
+    host = urlparse(url).netloc
+    try:
+        start = time.time()
+        tree = _reader._extract(html, host, content_type)
+        middle = time.time()
+        text = _reader._html2text(tree)
+    except Exception:
+        return (url, None, 0.0, 0.0, None)
+    template = (host, _reader.templates.get(host))
+    return (url, text, middle - start, time.time() - middle, template)
+
+class BatchReader:
+    """ Reads full text of many pages. Pages are downloaded by threads
+        (connections are kept alive by Http), text is extracted by a pool of
+        processes, so that all the cores are used. Templates learned by the
+        processes are copied to 'templates'.
+    """
+    def __init__(self, workers=None, downloaders=8, templates=None):
+        self.workers = workers or multiprocessing.cpu_count() # processes
+        self.downloaders = downloaders # threads
+        self.templates = templates
+
+    def read(self, urls):
+        """ Yields (url, text) in the order in which the texts are ready.
+            Text is None if the page cannot be downloaded or extracted.
+        """
+        urls = list(urls)
+        if not urls:
+            return
+
+        # Pool is created before the threads are started, processes are
+        # forked without them
+        selectors = self.templates.selectors if self.templates else {}
+        pool = multiprocessing.Pool(self.workers, _init, (selectors,))
+        tasks = Queue.Queue()
+        for url in urls:
+            tasks.put(url)
+        results = Queue.Queue()
+        cancelled = threading.Event()
+        # Downloaded pages wait for extraction, their number is limited
+        pending = threading.Semaphore(self.workers * 2)
+
+        def download():
+            while not cancelled.is_set():
+                try:
+                    url = tasks.get_nowait()
+                except Queue.Empty:
+                    return
+                pending.acquire()
+                if cancelled.is_set():
+                    return
+                try:
+                    # Links which don't lead to web pages and pages which
+                    # are too large are not downloaded to the end
+                    with Stats.timer('fulltext', url, 'download'):
+                        (content_type, chunks) = Http.get_page(url)
+                        html = ''.join(chunks)
+                except Exception:
+                    results.put((url, None, 0.0, 0.0, None))
+                    continue
+                Stats.add('fulltext', url, bytes=len(html))
+                pool.apply_async(_extract, (url, html, content_type),
+                                 callback=results.put)
+
+        threads = []
+        for _ in range(min(self.downloaders, len(urls))):
+            thread = threading.Thread(target=download)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        try:
+            for _ in range(len(urls)):
+                while True:
+                    # Timeout makes the main thread responsive to CTRL+C
+                    try:
+                        (url, text, extract_time, html2text_time,
+                         template) = results.get(timeout=0.1)
+                        break
+                    except Queue.Empty:
+                        pass
+                pending.release()
+                if template and self.templates is not None:
+                    self.templates.learn(*template)
+                Stats.add('fulltext', url, extract_time=extract_time,
+                          html2text_time=html2text_time)
+                yield (url, text)
+        finally:
+            cancelled.set()
+            for _ in threads:
+                pending.release() # downloaders waiting for a slot
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from configobj import ConfigObj
+from os.path import join
+import os
+import os.path
+import pickle
+from Storage import save_atomic
+
+# Changed when the format of the index changes
+INDEX_VERSION = 1
+
+_bool = lambda value: bool(int(value))
+
+# Options of a channel: (option, attribute, type, default value)
+OPTIONS = (
+    ('Name',            'name',             unicode, None),
+    ('URL',             'url',              unicode, None),
+    ('GetFullText',     'get_full_text',    _bool,   False),
+    ('ShowTitle',       'show_title',       _bool,   True),
+    ('ShowSubtitle',    'show_subtitle',    _bool,   True),
+    ('HistoryLength',   'history_length',   int,     15),
+    ('Timeout',         'timeout',          float,   30.0),
+    ('RefreshInterval', 'refresh_interval', float,   0.0), # minutes, 0 - only at start
+)
+
+class ConfigError(Exception):
+    """ Configuration of a channel is not valid
+    """
+    pass
+
+class ChannelConfig(object):
+    """ Validated configuration of a channel
+    """
+    __slots__ = tuple(attr for (_, attr, _, _) in OPTIONS)
+
+    def __init__(self, values):
+        for (_, attr, _, _) in OPTIONS:
+            setattr(self, attr, values[attr])
+
+def parse(path):
+    """ Reads configuration file of a channel, returns values of the
+        options (attribute -> value)
+    """
+    conf = ConfigObj(path, encoding='utf-8')
+
+    values = {}
+    for (option, attr, type_, default) in OPTIONS:
+        if option not in conf:
+            if default is None:
+                raise ConfigError('%s: %s is missing' % (path, option))
+            values[attr] = default
+            continue
+        try:
+            values[attr] = type_(conf[option])
+        except (ValueError, UnicodeError):
+            raise ConfigError('%s: invalid value of %s' % (path, option))
+    return values
+
+class ChannelIndex:
+    """ Configuration of the channels. Files which haven't changed since
+        the previous session are not parsed, their configuration is read
+        from the index.
+    """
+    def __init__(self, path_channels, path_index=None):
+        self.path_channels = path_channels
+        self.path_index = path_index
+        self.files = {}       # file name -> (mtime, size, values)
+        self.changed = False  # index has to be saved
+
+        if path_index and os.path.isfile(path_index):
+            try:
+                with open(path_index, 'rb') as f:
+                    version, files = pickle.load(f)
+            except Exception:
+                pass # index will be built again
+            else:
+                if version == INDEX_VERSION:
+                    self.files = files
+
+    def read(self, file_names):
+        """ Returns configuration of the channels (in the same order)
+        """
+        files = {}
+        configs = []
+        for file_name in file_names:
+            path = join(self.path_channels, file_name)
+            st = os.stat(path)
+            entry = self.files.get(file_name)
+            if entry is None or entry[:2] != (st.st_mtime, st.st_size):
+                entry = (st.st_mtime, st.st_size, parse(path))
+                self.changed = True
+            files[file_name] = entry
+            configs.append(ChannelConfig(entry[2]))
+
+        # Removed files are forgotten
+        if set(files) != set(self.files):
+            self.changed = True
+        self.files = files
+        return configs
+
+    def save(self):
+        """ Saves the index if it has changed
+        """
+        if self.path_index and self.changed:
+            save_atomic(self.path_index, (INDEX_VERSION, self.files))
+            self.changed = False
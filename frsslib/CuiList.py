@@ -24,12 +24,17 @@ class CuiList():
         self.scroll = 0             # number of lines the page is shifted by
         self.selection = 0          # item to be highlighted (or None)
         self.page_size = 5          # PageDown, PageUp behaviour
+        self.idle_timeout = -1      # ms, 'idle' callback is called if no key
+                                    # is pressed within this time (-1 - never)
+        self._lines = {}            # item -> text, cached for display_width
+        self._screen = None         # rows which are currently displayed
         locale.setlocale(locale.LC_ALL, 'en_US.UTF-8') # UTF-8 for ncurses
         
     def register_cb(self, name, cb, args=[]):
         """Registers callback
            Name:        Event:
            key_pressed  when key is pressed
+           idle         when no key is pressed within idle_timeout
         """
         self.callback[name] = cb
         self.callback_args[name] = args
@@ -43,7 +48,6 @@ class CuiList():
         """
         try:
             self.enable_curses()
-            (self.display_height, self.display_width) = self.stdscr.getmaxyx()                
             self.setup_curses()
             while True:
                 self._print_cui()
@@ -68,6 +72,7 @@ class CuiList():
         except:
             pass
 
+        self._update_size()
         self.setup_curses()
 
     def disable_curses(self):
@@ -83,12 +88,56 @@ class CuiList():
         """Does application specyfic configuration of curses
         """
         curses.curs_set(0)
+        self.stdscr.timeout(self.idle_timeout)
+
+    def print_message(self, text):
+        """Prints text in the bottom line of the screen at once, e.g. while
+           the user waits for something
+        """
+        y = self.display_height - 1
+        self.stdscr.move(y, 0)
+        self.stdscr.clrtoeol()
+        self.stdscr.addstr(y, 0, self._line(text))
+        self.stdscr.noutrefresh()
+        curses.doupdate()
+        self._screen = None # whole CUI has to be printed again
+
+    def read_line(self, prompt):
+        """Reads text typed by the user in the bottom line of the screen.
+           Returns unicode text, empty if nothing has been typed.
+        """
+        y = self.display_height - 1
+        prompt = prompt.encode('utf8')
+        self.stdscr.move(y, 0)
+        self.stdscr.clrtoeol()
+        self.stdscr.addstr(y, 0, prompt)
+        curses.echo()
+        curses.curs_set(1)
+        self.stdscr.timeout(-1) # idle callback is not called when typing
+        try:
+            text = self.stdscr.getstr(y, len(prompt))
+        except curses.error:
+            text = ''
+        finally:
+            curses.noecho()
+            self.setup_curses()
+            self._screen = None # whole CUI has to be printed again
+        return text.decode('utf8', 'replace').strip()
 
     def _wait_for_user(self):
         """Interacts with the user when CUI is displayed
         """
         
-        key = self.stdscr.getkey()
+        try:
+            key = self.stdscr.getkey()
+        except curses.error:
+            # No key has been pressed within idle_timeout
+            if 'idle' in self.callback:
+                return self.call_cb('idle')
+            return False
+
+        if key == 'KEY_RESIZE':
+            self._update_size()
         
         if self.selection != None:
             if key == 'KEY_UP':
@@ -113,61 +162,98 @@ class CuiList():
                 if self.selection - self.scroll >= self.display_height - len(self.header):
                     self.scroll = len(self.header) + self.selection - self.display_height + 1
 
+            if key == 'KEY_RESIZE':
+                # Keep the selection visible
+                if self.selection - self.scroll >= self.display_height - len(self.header):
+                    self.scroll = len(self.header) + self.selection - self.display_height + 1
+                if self.selection - self.scroll < 0:
+                    self.scroll = self.selection
+
             return self.call_cb('key_pressed', [key])
 
-    def _print_item(self, position, selected, header=False):
-        """Prints single line of the CUI
+    def _update_size(self):
+        """Reads size of the terminal. Whole CUI has to be printed again.
         """
-        x = 0
-        y = position
-        from_y = 0
-        if header:            
-            item = self.header[position]
-        else:
-            display_y_offset = len(self.header)
-            y += display_y_offset - self.scroll
-            item = self.items[position]
-            from_y = max(0, display_y_offset)
-        
-        #text = str(item)#.encode('utf8').replace('\n', ' ')
-        text = item.encode('utf8').replace('\n', ' ')
-
-        if (y >= from_y) and (y < self.display_height):
+        size = self.stdscr.getmaxyx()
+        if size != (self.display_height, self.display_width):
+            (self.display_height, self.display_width) = size
+            self._lines = {}
+        self._screen = None
 
+    def _line(self, item):
+        """Returns text of the item which fits in the line
+        """
+        text = self._lines.get(item)
+        if text is None:
+            text = item.encode('utf8').replace('\n', ' ')
             w = self.display_width-1 # self.stdscr.addstr sometimes raise an error when full width used
             if len(text) > w:
                 text = (text[0:max(w-3,0)] + '...')[0:w]
+            if len(self._lines) > 10000:
+                self._lines = {}
+            self._lines[item] = text
+        return text
 
-            if selected and not header:
-                self.stdscr.attron(curses.A_STANDOUT) # Highlighting ON
-
-            if hasattr(item, 'bold'):
-                if item.bold:
-                    self.stdscr.attron(curses.A_BOLD) # Bold ON            
+    def _rows(self):
+        """Returns what should be displayed in each row of the screen:
+           (text, selected, bold) or None for an empty row
+        """
+        rows = [None] * self.display_height
 
-            try:            
-                self.stdscr.addstr(y, x, text)
-            except curses.error, e:
-                raise PrintingError(e, y, x, text)
+        # Header
+        for position in range(min(len(self.header), self.display_height)):
+            item = self.header[position]
+            rows[position] = (self._line(item), False, getattr(item, 'bold', 0))
 
-            self.stdscr.attroff(curses.A_STANDOUT)    # Highlighting OFF
-            self.stdscr.attroff(curses.A_BOLD)        # Bold OFF
+        # Regular lines, only the ones which are visible
+        display_y_offset = len(self.header)
+        first = max(self.scroll, 0)
+        last = min(len(self.items), self.scroll + self.display_height - display_y_offset)
+        for position in range(first, last):
+            item = self.items[position]
+            y = position + display_y_offset - self.scroll
+            rows[y] = (self._line(item), position == self.selection,
+                       getattr(item, 'bold', 0))
+        return rows
 
-    def _print_cui(self):
-        """Prints whole CUI
+    def _print_row(self, y, row):
+        """Prints single line of the CUI
         """
+        x = 0
+        self.stdscr.move(y, x)
+        self.stdscr.clrtoeol()
+        if row is None:
+            return
 
-        self.stdscr.clear()
+        (text, selected, bold) = row
+        if selected:
+            self.stdscr.attron(curses.A_STANDOUT) # Highlighting ON
+        if bold:
+            self.stdscr.attron(curses.A_BOLD)     # Bold ON
 
-        # Print header
-        for position in range(len(self.header)):
-            self._print_item(position, position==self.selection, True)
+        try:            
+            self.stdscr.addstr(y, x, text)
+        except curses.error, e:
+            raise PrintingError(e, y, x, text)
+
+        self.stdscr.attroff(curses.A_STANDOUT)    # Highlighting OFF
+        self.stdscr.attroff(curses.A_BOLD)        # Bold OFF
+
+    def _print_cui(self):
+        """Prints CUI. Only the rows which have changed are printed.
+        """
+        rows = self._rows()
+        if self._screen is None:
+            self.stdscr.erase()
+            self._screen = [None] * len(rows)
 
-        # Print regular lines
-        for position in range(len(self.items)):
-            self._print_item(position, position==self.selection)
+        for y in range(len(rows)):
+            if rows[y] != self._screen[y]:
+                self._print_row(y, rows[y])
+        self._screen = rows
 
-        self.stdscr.refresh()
+        self.stdscr.noutrefresh()
+        curses.doupdate()
 
 class Bold(unicode):
     """ Embedds text that should be displayed in bold
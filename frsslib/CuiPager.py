@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import curses
+
+# Control sequences which are used to highlight headers (see WwwReader)
+_sequence = re.compile(u'\033\\[([0-9;]*)m')
+
+class CuiPager:
+    """ Displays text on the screen of the CUI, so that curses don't have to
+        be disabled and 'less' doesn't have to be started for every item
+    """
+    def __init__(self, cui):
+        self.cui = cui
+        self.top = 0    # first line displayed
+
+    def display(self, render):
+        """ Displays text until the user goes back. 'render(width)' returns
+            rendering of the text for given width.
+        """
+        cui = self.cui
+        rendering = render(cui.display_width - 1)
+        cui.stdscr.timeout(-1) # idle callback is not called when reading
+        try:
+            while True:
+                self._print(rendering)
+                try:
+                    key = cui.stdscr.getkey()
+                except curses.error:
+                    continue
+                if key in ['q', 'KEY_LEFT', 'KEY_BACKSPACE']:
+                    return
+                if key == 'KEY_RESIZE':
+                    # Roughly the same part of the text stays on the screen
+                    width = rendering.width
+                    cui._update_size()
+                    rendering = render(cui.display_width - 1)
+                    self.top = self.top * width // max(rendering.width, 1)
+                else:
+                    self._scroll(key, rendering)
+        finally:
+            cui.setup_curses()
+            cui._screen = None # whole CUI has to be printed again
+
+    def _scroll(self, key, rendering):
+        height = self.cui.display_height
+        step = {'KEY_DOWN': 1, 'j': 1, 'KEY_UP': -1, 'k': -1,
+                'KEY_NPAGE': height - 1, ' ': height - 1, 'f': height - 1,
+                'KEY_PPAGE': 1 - height, 'b': 1 - height,
+                'KEY_HOME': -self.top, 'g': -self.top}.get(key)
+        if key in ['KEY_END', 'G']:
+            while rendering.wrap(len(rendering.lines) + 1):
+                pass
+            step = len(rendering.lines)
+        if step is not None:
+            self.top = max(self.top + step, 0)
+
+    def _print(self, rendering):
+        stdscr = self.cui.stdscr
+        height = self.cui.display_height
+        # Last page is aligned to the bottom of the screen
+        rendering.wrap(self.top + height)
+        self.top = max(min(self.top, len(rendering.lines) - height), 0)
+        stdscr.erase()
+        for (y, line) in enumerate(rendering.lines[self.top:self.top + height]):
+            self._print_line(y, line)
+        stdscr.noutrefresh()
+        curses.doupdate()
+
+    def _print_line(self, y, line):
+        """ Prints a line, control sequences are replaced by attributes
+        """
+        stdscr = self.cui.stdscr
+        x = 0
+        parts = _sequence.split(line)
+        for (i, part) in enumerate(parts):
+            if i % 2:
+                # Sequence: reset or highlight
+                if part in ['', '0']:
+                    stdscr.attroff(curses.A_BOLD)
+                else:
+                    stdscr.attron(curses.A_BOLD)
+            elif part:
+                text = part[:self.cui.display_width - 1 - x].encode('utf8')
+                try:
+                    stdscr.addstr(y, x, text)
+                except curses.error:
+                    pass # text doesn't fit
+                x += len(part)
+            if x >= self.cui.display_width - 1:
+                break
+        stdscr.attroff(curses.A_BOLD)
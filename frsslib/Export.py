@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import email.utils
+import json
+import mailbox
+import os
+import re
+from email.header import Header
+from email.mime.text import MIMEText
+
+_unsafe = re.compile(r'[^\w.-]+', re.UNICODE) # in file names
+
+class DirectoryExport:
+    """ Writes each item to a separate file: DIR/<channel>/<title>.txt
+    """
+    def __init__(self, path):
+        self.path = path
+        self.names = set() # files written so far
+
+    def _file_name(self, name, title):
+        base = os.path.join(self.path, _unsafe.sub(u'_', name).strip(u'_'),
+                            _unsafe.sub(u'_', title).strip(u'_')[:80] or u'item')
+        path = base + u'.txt'
+        number = 1
+        while path in self.names:
+            number += 1
+            path = u'%s_%d.txt' % (base, number)
+        self.names.add(path)
+        return path.encode('utf-8')
+
+    def write(self, name, item, text):
+        path = self._file_name(name, item.title)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write((u'%s\n%s\n\n' % (item.title, item.link)).encode('utf-8'))
+            f.write(text)
+
+    def close(self):
+        pass
+
+class JsonlExport:
+    """ Writes each item as JSON object in a separate line
+    """
+    def __init__(self, path):
+        self.f = open(path, 'w')
+
+    def write(self, name, item, text):
+        record = {'channel': name, 'title': item.title, 'link': item.link,
+                  'text': text.decode('utf-8', 'replace')}
+        self.f.write(json.dumps(record, sort_keys=True) + '\n')
+
+    def close(self):
+        self.f.close()
+
+class MboxExport:
+    """ Writes each item as a message, so that it can be read by e-mail
+        clients
+    """
+    def __init__(self, path):
+        self.mbox = mailbox.mbox(path)
+        self.mbox.lock()
+
+    def write(self, name, item, text):
+        message = MIMEText(text, 'plain', 'utf-8')
+        message['From'] = Header(name, 'utf-8')
+        message['Subject'] = Header(item.title, 'utf-8')
+        message['Date'] = email.utils.formatdate(localtime=True)
+        message['Content-Location'] = item.link.encode('utf-8')
+        self.mbox.add(message)
+
+    def close(self):
+        self.mbox.flush()
+        self.mbox.unlock()
+        self.mbox.close()
+
+def open_export(path):
+    """ Returns export for the path: mbox file (*.mbox), JSON lines file
+        (*.jsonl) or a directory (anything else)
+    """
+    if path.endswith('.mbox'):
+        return MboxExport(path)
+    if path.endswith('.jsonl'):
+        return JsonlExport(path)
+    return DirectoryExport(path.decode('utf-8'))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from urlparse import urljoin
+from lxml import etree
+from requests.exceptions import Timeout
+import feedparser
+import time
+import Stats
+
+# Feeds are downloaded in chunks of this size [bytes]
+CHUNK_SIZE = 64 * 1024
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+RSS1 = '{http://purl.org/rss/1.0/}'
+RDF = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}RDF'
+CONTENT = '{http://purl.org/rss/1.0/modules/content/}encoded'
+ABOUT = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about'
+
+# Hints of RSS 2.0 feeds: element -> (key in the result, child element)
+SKIP = {'skipHours': ('skip_hours', 'hour'), 'skipDays': ('skip_days', 'day')}
+
+# Root element -> (namespace, channel element, item element)
+FORMATS = {
+    'rss':         ('',   'channel',        'item'),         # RSS 0.9x, 2.0
+    RDF:           (RSS1, RSS1 + 'channel', RSS1 + 'item'),  # RSS 1.0
+    ATOM + 'feed': (ATOM, ATOM + 'feed',    ATOM + 'entry'), # Atom 1.0
+}
+
+class FeedError(Exception):
+    """ Feed cannot be parsed by streaming parser
+    """
+    pass
+
+def _text(el):
+    if el is None:
+        return None
+    if el.get('type') == 'xhtml':
+        raise FeedError('XHTML content')
+    return unicode(el.text or u'').strip()
+
+def _rss_item(el, base):
+    ns = RSS1 if el.tag.startswith(RSS1) else ''
+    link = _text(el.find(ns + 'link'))
+    guid = el.find('guid')
+    if not link:
+        # Permanent link can be given as guid
+        if guid is not None and guid.get('isPermaLink') != 'false':
+            link = _text(guid)
+    guid = _text(guid) if ns == '' else el.get(ABOUT)
+    summary = _text(el.find(ns + 'description'))
+    if summary is None:
+        summary = _text(el.find(CONTENT))
+    return {'title': _text(el.find(ns + 'title')) or u'',
+            'link': urljoin(base, link) if link else u'',
+            'summary': summary or u'',
+            'id': unicode(guid).strip() if guid else None}
+
+def _atom_item(el, base):
+    link = u''
+    for link_el in el.iterfind(ATOM + 'link'):
+        if link_el.get('rel', 'alternate') == 'alternate':
+            link = urljoin(base, unicode(link_el.get('href', u'')).strip())
+            break
+    summary = _text(el.find(ATOM + 'summary'))
+    if summary is None:
+        summary = _text(el.find(ATOM + 'content'))
+    return {'title': _text(el.find(ATOM + 'title')) or u'',
+            'link': link,
+            'summary': summary or u'',
+            'id': _text(el.find(ATOM + 'id')) or None}
+
+def parse(chunks, limit=None, base=''):
+    """ Parses RSS or Atom feed which is read chunk by chunk. Only the
+        fields used by frss are extracted (and hints for the scheduler:
+        ttl, skip_hours, skip_days). Reading stops as soon as 'limit'
+        items are collected. Result has the same structure as the result of
+        feedparser. FeedError is raised if the feed has to be parsed by
+        feedparser instead (unknown format, malformed XML, any other error
+        of the parser).
+    """
+    parser = etree.XMLPullParser(events=('start', 'end'), resolve_entities=False)
+    feed = {}
+    items = []
+    root = None
+    channel_tag = item_tag = None
+    feed_fields = {}
+
+    chunks = iter(chunks)
+    while True:
+        # Errors of the download are not errors of the feed
+        chunk = next(chunks, None)
+        try:
+            if chunk is None:
+                parser.close()
+                break
+            parser.feed(chunk)
+            for (event, el) in parser.read_events():
+                if root is None:
+                    root = el.tag
+                    if root not in FORMATS:
+                        raise FeedError('Unknown format: %s' % root)
+                    ns, channel_tag, item_tag = FORMATS[root]
+                    parse_item = _atom_item if ns == ATOM else _rss_item
+                    feed_fields = {ns + 'title': 'title',
+                                   ns + 'description': 'subtitle',
+                                   ns + 'subtitle': 'subtitle',
+                                   ns + 'ttl': 'ttl'}
+                if event != 'end':
+                    continue
+
+                if el.tag == item_tag:
+                    items.append(parse_item(el, base))
+                    if len(items) == limit:
+                        return {'feed': feed, 'items': items}
+
+                    # Parsed items are not needed any more
+                    el.clear()
+                    while el.getprevious() is not None:
+                        del el.getparent()[0]
+
+                elif el.tag in feed_fields and el.getparent() is not None \
+                        and el.getparent().tag == channel_tag:
+                    feed.setdefault(feed_fields[el.tag], _text(el))
+
+                elif el.tag in SKIP and el.getparent() is not None \
+                        and el.getparent().tag == channel_tag:
+                    (key, child) = SKIP[el.tag]
+                    feed[key] = [_text(c) for c in el.iterfind(child)]
+        except FeedError:
+            raise
+        except Exception as e:
+            # Malformed XML or unexpected content, e.g. invalid link
+            raise FeedError(str(e))
+
+    return {'feed': feed, 'items': items}
+
+def read(response, limit=None, name=None, deadline=None):
+    """ Parses the feed while it is being downloaded ('requests' response
+        opened with stream=True). Download stops when 'limit' items are
+        read. Feeds which cannot be parsed this way are parsed by
+        feedparser. 'name' of the channel is used in statistics.
+        Timeout is raised if the download continues after 'deadline'
+        (time.time()), it is checked after each chunk.
+    """
+    chunks = []
+    waiting = [0.0] # time spent waiting for the data
+    def download():
+        data = response.iter_content(CHUNK_SIZE)
+        while True:
+            start = time.time()
+            chunk = next(data, None)
+            waiting[0] += time.time() - start
+            if chunk is None:
+                return
+            if deadline is not None and time.time() > deadline:
+                # Server which sends the feed slowly would keep the worker
+                # busy, timeout of 'requests' applies to each read only
+                raise Timeout('Feed is downloaded for too long')
+            chunks.append(chunk)
+            yield chunk
+
+    start = time.time()
+    stream = download()
+    try:
+        rss = parse(stream, limit, response.url)
+        fallback = 0
+    except FeedError:
+        # Download the rest of the feed
+        for _ in stream:
+            pass
+
+        # Headers let feedparser detect encoding and resolve relative links.
+        # Content is already decompressed by requests.
+        headers = {k.lower(): v for k, v in response.headers.items()
+                   if k.lower() != 'content-encoding'}
+        headers.setdefault('content-location', response.url)
+        rss = feedparser.parse(''.join(chunks), response_headers=headers)
+        fallback = 1
+
+    Stats.add('channel', name, download_time=waiting[0],
+              parse_time=time.time() - start - waiting[0],
+              bytes=sum(len(chunk) for chunk in chunks),
+              items=len(rss['items']), fallbacks=fallback)
+    return rss
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+
+# Policy shared by all the downloads
+policy = dict(
+    timeout          = 10, # seconds
+    retries          = 2,  # for connection errors and 5xx responses
+    host_connections = 4,  # kept alive for each host
+    max_page_size    = 5 * 1024 * 1024, # bytes of a page (see get_page)
+)
+
+# Content types of the pages which are read as HTML
+HTML = ('text/html', 'application/xhtml+xml')
+
+# Pages are downloaded in chunks of this size [bytes]
+CHUNK_SIZE = 64 * 1024
+
+# Longest pause between the retries [s]
+MAX_BACKOFF = 2
+
+class PageError(Exception):
+    """ Page is not of the expected type or it is too large
+    """
+    pass
+
+_session = None
+_lock = threading.Lock()
+
+def configure(timeout=None, retries=None, host_connections=None,
+              max_page_size=None):
+    """ Changes policy of the downloads. Has to be called before the first
+        download.
+    """
+    for (k, v) in (('timeout', timeout), ('retries', retries),
+                   ('host_connections', host_connections),
+                   ('max_page_size', max_page_size)):
+        if v is not None:
+            policy[k] = v
+
+def encodings():
+    """ Returns encodings which are accepted. Brotli is used only if the
+        library which decodes it is installed.
+    """
+    try:
+        import brotli
+        return 'gzip, deflate, br'
+    except ImportError:
+        return 'gzip, deflate'
+
+def session():
+    """ Returns HTTP session shared by the whole application. Connections
+        are kept alive and reused by subsequent requests to the same host.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            # Imported when the first download starts, 'requests' takes a
+            # while to import
+            import logging
+            import requests
+            from requests.adapters import HTTPAdapter
+            from requests.packages.urllib3.util.retry import Retry
+
+            # Disable messages from 'requests' library
+            logging.getLogger("requests").setLevel(logging.WARNING)
+
+            class _Retry(Retry):
+                # BACKOFF_MAX in urllib3 before 1.26.9
+                BACKOFF_MAX = DEFAULT_BACKOFF_MAX = MAX_BACKOFF
+
+            # Retry-After is not followed here, it could block the download
+            # for hours regardless of the timeout. The last response is
+            # returned to the caller, which can take it into account.
+            retry = _Retry(total=policy['retries'], backoff_factor=0.5,
+                           status_forcelist=(500, 502, 503, 504),
+                           respect_retry_after_header=False,
+                           raise_on_status=False)
+            # pool_block - wait for a free connection instead of opening
+            # more than 'host_connections' to the same host
+            adapter = HTTPAdapter(pool_connections=100,
+                                  pool_maxsize=policy['host_connections'],
+                                  pool_block=True, max_retries=retry)
+            _session = requests.Session()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session.headers['Accept-Encoding'] = encodings()
+        return _session
+
+def close():
+    """ Closes connections which are kept alive
+    """
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def get(url, timeout=None, **kwargs):
+    """ Downloads url using the shared session
+    """
+    if timeout is None:
+        timeout = policy['timeout']
+    return session().get(url, timeout=timeout, **kwargs)
+
+def get_page(url, types=HTML, max_size=None):
+    """ Starts downloading a page. Returns its Content-Type and a generator
+        of the chunks of the content. PageError is raised as soon as it
+        turns out that the type of the page is not one of 'types' or that
+        the page is larger than 'max_size' (policy by default); the rest is
+        not downloaded. HTTPError of 'requests' is raised if the server
+        responds with an error.
+    """
+    if max_size is None:
+        max_size = policy['max_page_size']
+    response = get(url, stream=True)
+    try:
+        # Error pages are not articles
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        mime = content_type.split(';')[0].strip().lower()
+        if mime and mime not in types:
+            raise PageError('Not a web page: %s' % mime)
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > max_size:
+            raise PageError('Page is too large: %s bytes' % length)
+    except:
+        response.close()
+        raise
+
+    def chunks():
+        # Connection is reused only if the page has been read to the end
+        try:
+            size = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise PageError('Page is larger than %d bytes' % max_size)
+                yield chunk
+        finally:
+            response.close()
+    return content_type, chunks()
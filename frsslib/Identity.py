@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import re
+from urlparse import urlsplit, parse_qsl
+
+# Query parameters which are added for tracking, they don't change the page
+TRACKING = re.compile(r'^(utm_\w+|fbclid|gclid|dclid|msclkid|yclid|igshid|'
+                      r'mc_cid|mc_eid|_ga|_hsenc|_hsmi|ref|ref_src|cmpid|'
+                      r'ncid|ocid|sr_share|at_medium|at_campaign)$')
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+MARKUP = re.compile(r'<[^>]*>|&#?\w+;')
+WORD = re.compile(r'\w+', re.UNICODE)
+
+def normalize_url(link):
+    """ Returns the link in a form which is the same for the links of the
+        same page: no scheme, lowercase host, no default port, no fragment,
+        no trailing slash, no tracking parameters, sorted query
+    """
+    link = link.strip()
+    try:
+        parts = urlsplit(link)
+        port = parts.port
+    except ValueError:
+        return link
+    host = parts.hostname or u''
+    if port and port != DEFAULT_PORTS.get(parts.scheme):
+        host += u':%d' % port
+    query = sorted(u'%s=%s' % (k, v) for (k, v)
+                   in parse_qsl(parts.query, keep_blank_values=True)
+                   if not TRACKING.match(k.lower()))
+    url = u'//' + host + (parts.path.rstrip(u'/') or u'/')
+    if query:
+        url += u'?' + u'&'.join(query)
+    return url
+
+def item_key(guid, link):
+    """ Returns identity of an item in its channel: GUID (or Atom id) if the
+        feed provides it, otherwise normalized link
+    """
+    return guid or normalize_url(link)
+
+def fingerprint(title, summary):
+    """ Returns fingerprint of the content of an item (words of the title
+        and the summary) or None if there is no summary. The same story
+        published by a few channels has the same fingerprint.
+    """
+    words = MARKUP.sub(u' ', summary).lower().split()
+    if not words:
+        return None
+    text = u' '.join(title.lower().split()) + u'|' + u' '.join(words)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:20]
@@ -1,25 +1,102 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from textwrap import fill
+from collections import OrderedDict
+from textwrap import TextWrapper
+import errno
 import subprocess
 
-def pager(text, width=0):
-    """Wraps the text according to the width of the screen. Then displays the
-       text using 'less' command
+class Rendering(object):
+    """ Text wrapped according to the width of the screen. Lines are wrapped
+        when they are needed for the first time, so that the beginning of
+        the text can be displayed before the rest is wrapped.
+    """
+    def __init__(self, text, width=0):
+        self.width = width
+        self.size = len(text)
+        self.lines = []  # lines wrapped so far (unicode)
+        self._source = iter(text.decode('utf-8', 'replace').split(u'\n'))
+        self._wrapper = TextWrapper(width) if width else None
+
+    def wrap(self, count):
+        """ Wraps lines until there are at least 'count' of them. Tells you
+            whether there are so many lines.
+        """
+        while len(self.lines) < count:
+            line = next(self._source, None)
+            if line is None:
+                return False
+            # 'wrap' preserves the words (dont't break them at the end of the
+            # line). Control sequences are considered to be words.
+            if self._wrapper:
+                self.lines.extend(self._wrapper.wrap(line) or [u''])
+            else:
+                self.lines.append(line)
+        return True
+
+    def __iter__(self):
+        position = 0
+        while self.wrap(position + 1):
+            yield self.lines[position]
+            position += 1
+
+class RenderCache:
+    """ Keeps renderings of recently displayed texts, so that they are not
+        wrapped again when an item is opened again. Least recently used
+        renderings are discarded when the cache exceeds its size.
     """
-    # 'fill' function used below preserves the words (dont't break them at the
-    # end of the line). \n would be replaced by spaces, so we have to prevent
-    # this. Control sequences are considered to be words.
-    if width:
-        lines = text.split('\n')
-        lines = [fill(line, width) for line in lines]
-        text = '\n'.join(lines)
+    def __init__(self, max_size=8*1024*1024):
+        self.max_size = max_size     # bytes of the texts
+        self.size = 0
+        self.renderings = OrderedDict() # (key, width) -> rendering
+
+    def get(self, key, width):
+        """ Returns rendering of the text identified by the key or None if
+            it's not cached for this width
+        """
+        rendering = self.renderings.pop((key, width), None)
+        if rendering is not None:
+            self.renderings[(key, width)] = rendering # most recently used
+        return rendering
 
+    def put(self, key, text, width):
+        """ Returns new rendering of the text, which is kept in the cache
+        """
+        rendering = Rendering(text, width)
+        old = self.renderings.pop((key, width), None)
+        if old is not None:
+            self.size -= old.size
+        self.renderings[(key, width)] = rendering
+        self.size += rendering.size
+        while self.size > self.max_size and len(self.renderings) > 1:
+            _, old = self.renderings.popitem(last=False)
+            self.size -= old.size
+        return rendering
+
+def less(rendering):
+    """ Displays the rendering using 'less' command. Lines are wrapped while
+        'less' reads them, so the first page is displayed at once.
+    """
     # -R allows to use control sequences (colorful syntax)
     # ncurses is assumed to be disabled, otherwise arrow keys stop working
     # after returning to ncurses
     proc = subprocess.Popen(['less', '-R'], stdin=subprocess.PIPE)
-    proc.stdin.write(text)
-    proc.stdin.close()
+    try:
+        for line in rendering:
+            proc.stdin.write(line.encode('utf-8') + '\n')
+    except IOError as e:
+        # User has quit before the whole text has been read
+        if e.errno != errno.EPIPE:
+            raise
+    finally:
+        try:
+            proc.stdin.close()
+        except IOError:
+            pass
     proc.wait()
+
+def pager(text, width=0):
+    """Wraps the text according to the width of the screen. Then displays the
+       text using 'less' command
+    """
+    less(Rendering(text, width))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import Queue
+
+class Prefetcher:
+    """ Downloads full text of the items in the background, so that it is
+        ready when the user opens an item. Texts are kept in memory until
+        they are taken.
+    """
+    def __init__(self, workers=2, max_size=20*1024*1024, templates=None):
+        self.workers = workers    # number of background threads
+        self.max_size = max_size  # memory budget [bytes]
+        self.templates = templates # shared with WwwReader of the threads
+        self.texts = {}           # url -> text
+        self.size = 0             # bytes used by self.texts
+        self.key = None           # what is being prefetched (e.g. channel)
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.threads = []
+
+    def start(self, key, urls):
+        """ Starts prefetching urls in the given order. Nothing happens if
+            urls with the same key are being prefetched already.
+        """
+        if key == self.key:
+            return
+        self.cancel()
+        self.key = key
+
+        tasks = Queue.Queue()
+        for url in urls:
+            if url not in self.texts:
+                tasks.put(url)
+
+        cancelled = self.cancelled = threading.Event()
+        self.threads = []
+        for _ in range(min(self.workers, tasks.qsize())):
+            thread = threading.Thread(target=self._worker,
+                                      args=(tasks, cancelled))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def join(self):
+        """ Waits until prefetching is finished
+        """
+        for thread in self.threads:
+            # Timeout makes the main thread responsive to CTRL+C
+            while thread.is_alive():
+                thread.join(0.1)
+
+    def cancel(self):
+        """ Stops prefetching. Texts which are ready are kept.
+        """
+        self.cancelled.set()
+        self.key = None
+
+    def pop(self, url):
+        """ Returns prefetched text and forgets it or None if the text is not
+            ready
+        """
+        with self.lock:
+            text = self.texts.pop(url, None)
+            if text is not None:
+                self.size -= len(text)
+        return text
+
+    def pop_all(self):
+        """ Returns all prefetched texts (url -> text) and forgets them
+        """
+        with self.lock:
+            texts = self.texts
+            self.texts = {}
+            self.size = 0
+        return texts
+
+    def _worker(self, tasks, cancelled):
+        from WwwReader import WwwReader
+        wr = WwwReader(False, self.templates)
+        while not cancelled.is_set():
+            try:
+                url = tasks.get_nowait()
+            except Queue.Empty:
+                return
+
+            try:
+                text = wr.read(url)
+            except:
+                continue # user will see the error when the item is opened
+
+            with self.lock:
+                if cancelled.is_set():
+                    return
+                if self.size + len(text) > self.max_size:
+                    # Memory budget is exhausted, items further on the list
+                    # won't fit either
+                    cancelled.set()
+                    return
+                self.texts[url] = text
+                self.size += len(text)
@@ -1,52 +1,249 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from configobj import ConfigObj
-from os.path import join
 from os import walk
-from copy import deepcopy
-import feedparser
+from urlparse import urlparse
+import os
+import os.path
+import pickle
+import threading
+import Queue
+import time
+import Http
+import Stats
+from ChannelIndex import ChannelIndex
+from Storage import save_atomic
+from Scheduler import server_hints, feed_hints
 
 class RssClient:
     """Reads configuration of the channels and downloads RSS content
     """
 
-    def __init__(self, path_channels):        
+    def __init__(self, path_channels, path_validators=None, path_index=None):
         # Find all config files
         self.path_channels = path_channels
         _, _, self.file_names = walk(path_channels).next()
 
-        # Prepare default channel configuration
-        default_values = dict(
-        GetFullText    = 0,
-        ShowTitle      = 1,
-        ShowSubtitle   = 1,
-        HistoryLength  = 15,
-        )
-        self.ch_init_conf = ConfigObj(default_values)        
-        
+        # Configuration of the channels which is parsed already
+        self.index = ChannelIndex(path_channels, path_index)
+
+        # Validators (ETag, Last-Modified) of the channels whose items are
+        # stored. Key is the channel name.
+        self.path_validators = path_validators
+        self.validators = {}
+        # Validators of the updated channels, until the channels are merged
+        # (channel name -> validator, None - no validator)
+        self.received = {}
+
+        # Channels downloaded at the same time from one host
+        self.host_slots = {}
+        self.lock = threading.Lock()
+
     def read_config(self):
+        """ Reads configuration of the channels. ConfigError is raised if
+            configuration is not valid.
+        """
         self.channels = []
-        for file_name in self.file_names:
-            # Initialize with default values
-            ch_conf = deepcopy(self.ch_init_conf)
-            
-            # Update with actual values
-            ch_conf.update(ConfigObj(join(self.path_channels, file_name)))
-            
+        for ch_conf in self.index.read(self.file_names):
             # conf - configuration from the config file
             # rss - content downloaded from RSS channel
-            self.channels.append({'conf': ch_conf, 'rss': {}, 'broken': False})
-            
-    def update_all(self):
-        # Download content of RSS channels
-        for ch in self.channels:
-            print 'Updating ' + ch['conf']['Name'] + '...'
-            rss = feedparser.parse(ch['conf']['URL'])
-            ch['rss'] = rss
-            broken = rss['feed'] == {}
-            ch['broken'] = broken
-            if broken:
-                print ' FAILED'
-
-        
+            # unchanged - channel hasn't changed since the previous session
+            # updated - time of the last update
+            # updating - update is in progress
+            # hints - when the server and the feed ask to be read again
+            self.channels.append({'conf': ch_conf, 'rss': {}, 'broken': False,
+                                  'unchanged': False, 'updated': 0,
+                                  'updating': False, 'hints': {}})
+        self.index.save()
+
+    def load_validators(self):
+        """ Loads validators of the channels from the previous session
+        """
+        if self.path_validators and os.path.isfile(self.path_validators):
+            with open(self.path_validators, 'rb') as f:
+                self.validators = pickle.load(f)
+
+    def accept_validators(self, channels):
+        """ Takes validators received for the channels, once their items
+            have been stored. Otherwise, after a crash, the server could
+            answer 'not modified' for items which were never stored.
+        """
+        with self.lock:
+            for ch in channels:
+                name = ch['conf'].name
+                if name in self.received:
+                    validator = self.received.pop(name)
+                    if validator is None:
+                        self.validators.pop(name, None)
+                    else:
+                        self.validators[name] = validator
+
+    def save_validators(self):
+        """ Saves validators of the channels to a file
+        """
+        if self.path_validators:
+            # Channels are updated in the background meanwhile
+            with self.lock:
+                validators = dict(self.validators)
+            save_atomic(self.path_validators, validators)
+
+    def keep_validators(self, names):
+        """ Discards validators of the channels which are not listed. Items
+            of such channels are not stored, so they have to be downloaded.
+        """
+        with self.lock:
+            self.validators = {k: v for k, v in self.validators.items()
+                               if k in names}
+
+    def update(self, ch):
+        """ Downloads content of single RSS channel
+        """
+        # Parsers are imported when they are needed, it takes a while
+        import feedparser
+        import requests
+        import FeedStream
+
+        name = ch['conf'].name
+        url = ch['conf'].url
+
+        # Ask the server to send the feed only if it has changed
+        headers = {'User-Agent': feedparser.USER_AGENT}
+        with self.lock:
+            validator = self.validators.get(name)
+        if validator and validator['url'] == url:
+            if validator['etag']:
+                headers['If-None-Match'] = validator['etag']
+            if validator['modified']:
+                headers['If-Modified-Since'] = validator['modified']
+
+        ch['hints'] = {}
+        # Whole feed has to be downloaded within the timeout
+        deadline = time.time() + ch['conf'].timeout
+        try:
+            # Time until the headers are received, the rest is measured
+            # while the feed is being parsed
+            with Stats.timer('channel', name, 'download'):
+                response = Http.get(url, timeout=ch['conf'].timeout,
+                                    headers=headers, stream=True)
+            # Retry-After comes with errors as well
+            ch['hints']['delay'] = server_hints(response.headers)
+            try:
+                response.raise_for_status()
+                if response.status_code != 304:
+                    rss = FeedStream.read(response,
+                                          ch['conf'].history_length, name,
+                                          deadline)
+            finally:
+                # Connection is reused only if the feed has been read to
+                # the end
+                response.close()
+        except requests.RequestException:
+            rss = {'feed': {}, 'items': []}
+        else:
+            if response.status_code != 304:
+                ch['hints'].update(feed_hints(rss['feed']))
+            if response.status_code == 304:
+                # Not modified, items from the previous session are still valid
+                ch['rss'] = {'feed': validator['feed'], 'items': []}
+                ch['broken'] = False
+                ch['unchanged'] = True
+                Stats.add('channel', name, not_modified=1)
+                return
+
+            etag = response.headers.get('ETag')
+            modified = response.headers.get('Last-Modified')
+            validator = None
+            # Page which isn't a feed (e.g. of a captive portal) may have
+            # validators, the channel shouldn't be 'not modified' next time
+            if (etag or modified) and rss['feed'] != {}:
+                feed = {k: rss['feed'][k] for k in ('title', 'subtitle')
+                        if k in rss['feed']}
+                validator = {'url': url, 'etag': etag, 'modified': modified,
+                             'feed': feed}
+            with self.lock:
+                self.received[name] = validator
+
+        ch['rss'] = rss
+        ch['broken'] = rss['feed'] == {}
+        ch['unchanged'] = False
+        Stats.add('channel', name, failed=int(ch['broken']))
+
+    def update_all(self, workers=8, host_workers=2, channels=None,
+                   callback=None, wait=True):
+        """ Downloads content of RSS channels (all of them by default). Up to
+            'workers' channels are updated at the same time, but not more
+            than 'host_workers' from the same host.
+            'callback' is called with each channel as soon as it is updated,
+            by default progress is printed. If 'wait' is False, channels are
+            updated in the background.
+        """
+        if channels is None:
+            channels = self.channels
+
+        # Interleave the hosts, so that workers don't wait for each other
+        by_host = {}
+        for ch in channels:
+            ch['updating'] = True
+            host = urlparse(ch['conf'].url).netloc
+            by_host.setdefault(host, []).append(ch)
+        with self.lock:
+            for host in by_host:
+                if host not in self.host_slots:
+                    self.host_slots[host] = threading.BoundedSemaphore(host_workers)
+
+        tasks = Queue.Queue()
+        queues = by_host.values()
+        while queues:
+            for chs in queues:
+                tasks.put(chs.pop(0))
+            queues = [chs for chs in queues if chs]
+
+        lock = threading.Lock()
+        done = [0]
+        total = len(channels)
+
+        def print_progress(ch):
+            with lock:
+                done[0] += 1
+                msg = '[%d/%d] Updated %s' % (done[0], total,
+                                              ch['conf'].name.encode('utf-8'))
+                if ch['broken']:
+                    msg += ' FAILED'
+                print msg
+
+        if callback is None:
+            callback = print_progress
+
+        def worker():
+            while True:
+                try:
+                    ch = tasks.get_nowait()
+                except Queue.Empty:
+                    return
+
+                with self.host_slots[urlparse(ch['conf'].url).netloc]:
+                    try:
+                        self.update(ch)
+                    except Exception:
+                        # Unexpected error, the channel is broken but the
+                        # others are still updated
+                        ch['rss'] = {'feed': {}, 'items': []}
+                        ch['broken'] = True
+                        ch['unchanged'] = False
+                        Stats.add('channel', ch['conf'].name, failed=1)
+                ch['updated'] = time.time()
+                ch['updating'] = False
+
+                # Report as soon as the channel is ready
+                callback(ch)
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(max(1, min(workers, total)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        if wait:
+            for thread in threads:
+                # Timeout makes the main thread responsive to CTRL+C
+                while thread.is_alive():
+                    thread.join(0.1)
@@ -2,14 +2,123 @@
 # -*- coding: utf-8 -*-
 
 import pickle
+import sqlite3
+import os
 import os.path
+import time
+import Stats
+from SearchIndex import SearchIndex
+from Identity import item_key, normalize_url, fingerprint
 
+SQLITE_HEADER = 'SQLite format 3\x00'
+
+# Version of the database schema (PRAGMA user_version)
+SCHEMA_VERSION = 2
+
+# Columns of the schedule of the channels (see Scheduler)
+SCHEDULE = ('title', 'subtitle', 'fetched', 'due', 'interval', 'published',
+            'failures', 'ttl', 'skip_hours', 'skip_days')
+
+def _unicode(value):
+    """ Decodes text stored by the old versions, which kept UTF-8 bytes
+    """
+    if isinstance(value, str):
+        return value.decode('utf-8', 'replace')
+    return value
+
+class Item(object):
+    """ Item of a channel. Summary of an item which is stored in the
+        database is loaded when it is accessed for the first time.
+    """
+    __slots__ = ('title', 'link', 'new', 'key', 'article', '_summary',
+                 '_source', '_fingerprint')
+
+    def __init__(self, title, link, summary=None, new=True, source=None,
+                 key=None, article=None, fingerprint=None):
+        self.title = title
+        self.link = link
+        self.new = new            # True - unread, False - read
+        self.key = key or item_key(None, link) # identity in the channel
+        self.article = article or link # link of the first duplicate, items
+                                       # of the same article share read
+                                       # state and full text
+        self._summary = summary   # None - not loaded yet
+        self._source = source     # (connection, channel name) shared by
+                                  # the items loaded from the database
+        self._fingerprint = fingerprint # stored with the summary
+
+    @property
+    def summary(self):
+        if self._summary is None:
+            conn, channel = self._source
+            row = conn.execute('SELECT summary FROM items WHERE channel = ? '
+                               'AND key = ?', (channel, self.key)).fetchone()
+            self._summary = row[0] if row else u''
+        return self._summary
+
+    def is_stored(self):
+        """ Tells you whether the summary is still only in the database
+        """
+        return self._summary is None
+
+    @property
+    def fingerprint(self):
+        """ Fingerprint of the content (see Identity.fingerprint)
+        """
+        if self._summary is not None:
+            return fingerprint(self.title, self._summary)
+        return self._fingerprint
+
+    def __eq__(self, other):
+        # Summaries which are not loaded are compared by fingerprints
+        if not (self.key == other.key and self.link == other.link and
+                self.title == other.title and self.new == other.new):
+            return False
+        if self.is_stored() or other.is_stored():
+            return self.fingerprint == other.fingerprint
+        return self.summary == other.summary
+
+    def __ne__(self, other):
+        return not self == other
+
+class _Channels(dict):
+    """ Dictionary of channels which loads items of a channel from the
+        database when the channel is accessed for the first time
+    """
+    def __init__(self, conn, flags):
+        dict.__init__(self)
+        self.conn = conn
+        self.flags = flags # (channel, key) -> flag which is not saved yet
+        self.stored = {} # channel name -> keys stored in the database
+        self.names = set(row[0] for row in
+                         conn.execute('SELECT DISTINCT channel FROM items'))
+
+    def __contains__(self, k):
+        return dict.__contains__(self, k) or k in self.names
+
+    def __missing__(self, k):
+        if k not in self.names:
+            return [] # channel not stored yet
+        # Summaries are loaded when they are needed
+        rows = self.conn.execute('SELECT title, link, new, key, article, '
+                                 'fingerprint FROM items WHERE channel = ? '
+                                 'ORDER BY position', (k,))
+        source = (self.conn, k)
+        items = [Item(title, link, None, self.flags.get((k, key), bool(new)),
+                      source, key, article, fp)
+                 for (title, link, new, key, article, fp) in rows]
+        self.stored[k] = set(item.key for item in items)
+        dict.__setitem__(self, k, items)
+        return items
+
+    def is_loaded(self, k):
+        return dict.__contains__(self, k)
 
 class RssDatabase:
     """ Collects data from RSS client and from previous session. Decides
         which items are new and wihch should be discarded
     """
-    def __init__(self, path_db, rssc):
+    def __init__(self, path_db, rssc, path_search=None):
         self.path_db = path_db
         self.rssc = rssc
         
@@ -18,35 +127,425 @@ class RssDatabase:
         self.channels = {}     # self.channels merged with previous session
         self.new_channels = {} # channels imported from RSS client
 
+        # Only the changes are written to the database
+        self.dirty_channels = set()  # channels whose items changed
+        self.dirty_items = {}        # (channel, key) -> changed flag
+        self.conn = None
+
+        # Channel name -> number of unread items. Counted once when the
+        # database is opened, then kept up to date by mark() and merge().
+        self.unread = {}
+        self.data_version = None # of the database when unread was counted
+
+        # Channel name -> number of new items found by the last merge
+        self.added = {}
+
+        # Loaded when it is needed for the first time
+        self.search = SearchIndex(path_search)
+
     
-    def import_rss(self):
+    def import_rss(self, rss_channels=None):
+        """ Imports channels from RSS client (all of them by default)
+        """
+        if rss_channels is None:
+            rss_channels = self.rssc.channels
+
         channels = {}
-        for ch in self.rssc.channels:
+        for ch in rss_channels:
             # Check how many items should be displayed for each channel
-            name = ch['conf']['Name']
-            hist_len = int(ch['conf']['HistoryLength'])
+            name = ch['conf'].name
+            if ch['unchanged']:
+                # Channel hasn't changed since the previous session
+                continue
+            hist_len = ch['conf'].history_length
             
-            # Copy items from RSS client (only meaningful data)
-            items = [{k: item[k] for k in ('title', 'link', 'summary')}
-                     for item in ch['rss']['items']]
-            
-            # Clip the list of items
-            channels[name] = items[:hist_len]
+            # Copy items from RSS client (only meaningful data). Items
+            # repeated in the feed are taken once.
+            items = []
+            keys = set()
+            for item in ch['rss']['items'][:hist_len]:
+                key = item_key(item.get('id'), item['link'])
+                if key not in keys:
+                    keys.add(key)
+                    items.append(Item(item['title'], item['link'],
+                                      item['summary'], key=key))
+            channels[name] = items
+
+            # Only title & subtitle of the feed are needed any more
+            feed = ch['rss']['feed']
+            ch['rss'] = {'feed': {k: feed[k] for k in ('title', 'subtitle')
+                                  if k in feed},
+                         'items': []}
 
         self.new_channels = channels
         
+    def mark(self, name, item, new):
+        """ Marks an item as read (new=False) or unread (new=True). The same
+            article in other channels is marked as well.
+        """
+        if item.new == new:
+            return
+        item.new = new
+        self.dirty_items[(name, item.key)] = new
+        self._count(name, new)
+        for (k, key, stored) in self.conn.execute(
+                'SELECT channel, key, new FROM items WHERE article = ?',
+                (item.article,)):
+            if self.channels.is_loaded(k):
+                for other in self.channels[k]:
+                    if other.key == key and other.new != new:
+                        other.new = new
+                        self._count(k, new)
+            elif self.dirty_items.get((k, key), bool(stored)) != new:
+                self._count(k, new)
+            self.dirty_items[(k, key)] = new
+
+    def _count(self, k, new):
+        self.unread[k] = self.unread.get(k, 0) + (1 if new else -1)
+
+    def unread_counts(self):
+        """ Returns numbers of unread items of the channels (channel name ->
+            number). Items of the channels are not loaded.
+        """
+        if self.conn.execute('PRAGMA data_version').fetchone()[0] != \
+                self.data_version:
+            self._count_unread() # another session has saved changes
+        return self.unread
+
+    def has_new(self, name):
+        """ Tells you whether the channel has unread items
+        """
+        return self.unread_counts().get(name, 0) > 0
+
+    def _count_unread(self):
+        """ Counts unread items of the channels which are not loaded (all of
+            them when the database is opened). Flags which are not saved yet
+            are taken into account.
+        """
+        self.data_version = \
+            self.conn.execute('PRAGMA data_version').fetchone()[0]
+        counts = dict(self.conn.execute('SELECT channel, SUM(new) FROM items '
+                                        'GROUP BY channel'))
+        for ((k, key), new) in self.dirty_items.items():
+            row = self.conn.execute('SELECT new FROM items WHERE channel = ? '
+                                    'AND key = ?', (k, key)).fetchone()
+            if row is not None and k in counts:
+                counts[k] += int(new) - row[0]
+        for k in self.channels.names:
+            if not self.channels.is_loaded(k):
+                self.unread[k] = counts.get(k, 0)
+
     def save(self):
-        """ Saves current RSS content to a file
+        """ Saves changes of RSS content to the database. Other sessions
+            (e.g. daemon) can modify the database at the same time.
         """
-        with open(self.path_db, 'wb') as f:
-            pickle.dump(self.channels, f)
-            
+        if not self.dirty_channels and not self.dirty_items:
+            self.search.save()
+            return
+
+        start = time.time()
+        with self.conn: # single transaction
+            # Other sessions wait until the changes are saved
+            self.conn.execute('BEGIN IMMEDIATE')
+
+            for k in self.dirty_channels:
+                if k not in self.channels:
+                    self.conn.execute('DELETE FROM items WHERE channel = ?',
+                                      (k,))
+                    continue
+
+                items = self.channels[k]
+                keys = self._reconcile(k) - set(item.key for item in items)
+                self.conn.executemany(
+                    'DELETE FROM items WHERE channel = ? AND key = ?',
+                    [(k, key) for key in keys])
+                # Items whose summaries haven't been loaded are stored already
+                self.conn.executemany(
+                    'UPDATE items SET position = ?, new = ? '
+                    'WHERE channel = ? AND key = ?',
+                    [(position, item.new, k, item.key)
+                     for (position, item) in enumerate(items)
+                     if item.is_stored()])
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO items VALUES '
+                    '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(k, item.key, item.link, position, item.title,
+                      item.summary, item.new, normalize_url(item.link),
+                      fingerprint(item.title, item.summary), item.article)
+                     for (position, item) in enumerate(items)
+                     if not item.is_stored()])
+                self.channels.stored[k] = set(item.key for item in items)
+
+            self.conn.executemany(
+                'UPDATE items SET new = ? WHERE channel = ? AND key = ?',
+                [(new, k, key)
+                 for ((k, key), new) in self.dirty_items.items()
+                 if k not in self.dirty_channels])
+
+        Stats.add('database', self.path_db, save_time=time.time() - start,
+                  saved_channels=len(self.dirty_channels),
+                  saved_flags=len(self.dirty_items))
+        self.dirty_channels = set()
+        self.dirty_items.clear() # shared with self.channels
+        self.search.save()
+
+    def _reconcile(self, k):
+        """ Takes into account changes of the channel which have been saved
+            by other sessions since the channel was loaded. Returns keys of
+            the items which are stored in the database.
+        """
+        stored = self.channels.stored.get(k, set())
+        items = self.channels[k]
+        by_key = {item.key: item for item in items}
+
+        added = []
+        keys = set()
+        source = (self.conn, k)
+        for (title, link, new, key, article, fp) in self.conn.execute(
+                'SELECT title, link, new, key, article, fingerprint '
+                'FROM items WHERE channel = ? ORDER BY position', (k,)):
+            keys.add(key)
+            if key in by_key:
+                # Flag changed by another session, unless it was changed here
+                if (k, key) not in self.dirty_items:
+                    by_key[key].new = bool(new)
+            elif key not in stored:
+                # Item added by another session, it is newer than the others
+                added.append(Item(title, link, None, bool(new), source, key,
+                                  article, fp))
+
+        # Items removed by another session, whose summaries are not loaded,
+        # cannot be saved again
+        items[:] = added + [item for item in items
+                            if item.key in keys or not item.is_stored()]
+        self.unread[k] = sum(item.new for item in items)
+        return keys
+
     def load(self):
-        """ Loads RSS content from the previous session from a file
+        """ Opens the database. Items of the channels are loaded when they
+            are accessed.
+        """
+        if self._is_pickle():
+            self._migrate()
+        self._connect()
+        self.channels = _Channels(self.conn, self.dirty_items)
+        self._count_unread()
+
+    def _connect(self):
+        # Transactions are started explicitly, other sessions are waited for
+        self.conn = sqlite3.connect(self.path_db, timeout=60,
+                                    isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        if self._version() < SCHEMA_VERSION:
+            with self.conn:
+                # Another session may have upgraded the database meanwhile
+                self.conn.execute('BEGIN IMMEDIATE')
+                if self._version() < SCHEMA_VERSION:
+                    self._upgrade()
+
+    def _version(self):
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def _create(self):
+        # Items are identified by key (GUID or normalized link). Duplicates
+        # of an item in other channels (the same normalized link or
+        # fingerprint of the content) have the same article.
+        self.conn.execute('CREATE TABLE IF NOT EXISTS items ('
+                          'channel TEXT, key TEXT, link TEXT, '
+                          'position INTEGER, title TEXT, summary TEXT, '
+                          'new INTEGER, url TEXT, fingerprint TEXT, '
+                          'article TEXT, PRIMARY KEY (channel, key))')
+        for column in ('url', 'fingerprint', 'article'):
+            self.conn.execute('CREATE INDEX IF NOT EXISTS items_%s ON items '
+                              '(%s)' % (column, column))
+        # Schedule of the refreshes (see Scheduler)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS channels ('
+                          'name TEXT PRIMARY KEY, title TEXT, subtitle TEXT, '
+                          'fetched REAL, due REAL, interval REAL, '
+                          'published REAL, failures INTEGER, ttl REAL, '
+                          'skip_hours TEXT, skip_days TEXT)')
+        self.conn.execute('PRAGMA user_version = %d' % SCHEMA_VERSION)
+
+    def _upgrade(self):
+        """ Creates the tables which are missing. Items stored by the first
+            version (identified by link) are converted.
+        """
+        columns = [row[1] for row in
+                   self.conn.execute('PRAGMA table_info(items)')]
+        if columns and 'key' not in columns:
+            self._convert()
+        self._create()
+
+    def _convert(self):
+        """ Converts items stored by the first version (identified by link)
+            and finds their duplicates
+        """
+        print 'Upgrading database...'
+        self.conn.execute('ALTER TABLE items RENAME TO items_old')
+        self._create()
+        articles = {} # url or fingerprint -> article
+        rows = []
+        for (channel, link, position, title, summary, new) in \
+                self.conn.execute('SELECT channel, link, position, title, '
+                                  'summary, new FROM items_old '
+                                  'ORDER BY channel, position'):
+            url = normalize_url(link)
+            fp = fingerprint(title, summary)
+            article = articles.get(url) or articles.get(fp) or link
+            articles.setdefault(url, article)
+            if fp is not None:
+                articles.setdefault(fp, article)
+            rows.append((channel, url, link, position, title, summary, new,
+                         url, fp, article))
+        self.conn.executemany('INSERT OR IGNORE INTO items VALUES '
+                              '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        self.conn.execute('DROP TABLE items_old')
+
+    def _is_pickle(self):
+        """ Tells you whether the database is stored in the old format
+        """
+        if not os.path.isfile(self.path_db):
+            return False
+        with open(self.path_db, 'rb') as f:
+            header = f.read(len(SQLITE_HEADER))
+        return header != SQLITE_HEADER and header != ''
+
+    def _migrate(self):
+        """ Converts the database from the old format (pickle). Old file is
+            kept with '.pickle' extension.
+        """
+        print 'Migrating database...'
+        with open(self.path_db, 'rb') as f:
+            channels = pickle.load(f)
+
+        # New database replaces the old one only once it is complete
+        path_db = self.path_db
+        self.path_db = '%s.%d' % (path_db, os.getpid())
+        try:
+            self._connect()
+            self.channels = _Channels(self.conn, self.dirty_items)
+            for (k, items) in channels.items():
+                self.channels[_unicode(k)] = [
+                    Item(_unicode(item['title']), _unicode(item['link']),
+                         _unicode(item['summary']), item['new'])
+                    for item in items]
+            self.dirty_channels = set(self.channels)
+            self.save()
+            self.conn.close()
+        except:
+            if self.conn is not None:
+                self.conn.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.isfile(self.path_db + suffix):
+                    os.remove(self.path_db + suffix)
+            raise
+        finally:
+            self.path_db, path_new = path_db, self.path_db
+        os.rename(self.path_db, self.path_db + '.pickle')
+        os.rename(path_new, self.path_db)
+
+    def load_schedule(self):
+        """ Returns schedule of the channels saved by the previous sessions
+            (channel name -> record, see Scheduler)
+        """
+        schedule = {}
+        for row in self.conn.execute('SELECT name, %s FROM channels'
+                                     % ', '.join(SCHEDULE)):
+            record = dict(zip(SCHEDULE, row[1:]))
+            record['skip_hours'] = [int(hour) for hour
+                                    in (record['skip_hours'] or '').split()]
+            record['skip_days'] = (record['skip_days'] or '').split()
+            schedule[row[0]] = record
+        return schedule
+
+    def save_schedule(self, schedule):
+        """ Saves schedule of the channels (channel name -> record). Channels
+            removed from the config directory are forgotten.
+        """
+        names = set(ch['conf'].name for ch in self.rssc.channels)
+        rows = []
+        for (name, record) in schedule.items():
+            if name not in names:
+                continue
+            record = dict(record)
+            record['skip_hours'] = ' '.join(
+                str(hour) for hour in record.get('skip_hours') or [])
+            record['skip_days'] = ' '.join(record.get('skip_days') or [])
+            rows.append([name] + [record.get(column) for column in SCHEDULE])
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO channels VALUES (%s)'
+                % ', '.join('?' * (len(SCHEDULE) + 1)), rows)
+            stored = set(name for (name,) in
+                         self.conn.execute('SELECT name FROM channels'))
+            self.conn.executemany('DELETE FROM channels WHERE name = ?',
+                                  [(name,) for name in stored - names])
+
+    def load_search(self):
+        """ Loads the search index, so that it is kept up to date by merge()
         """
-        if os.path.isfile(self.path_db):
-            with open(self.path_db, 'rb') as f:
-                self.channels = pickle.load(f)
+        if not self.search.loaded:
+            self.search.load(self.conn)
+
+    def find(self, query, limit=None):
+        """ Returns (channel name, item) of the items of all the channels
+            which contain all the words of the query, newest first
+        """
+        self.load_search()
+        found = []
+        by_key = {}
+        for (k, key) in self.search.search(query)[:limit]:
+            if k not in by_key:
+                by_key[k] = {item.key: item for item in self.channels[k]}
+            item = by_key[k].get(key)
+            if item is not None:
+                found.append((k, item))
+        return found
+
+    def index_text(self, article, text):
+        """ Adds full text of an article to the search index
+        """
+        self.load_search()
+        for (k, key) in self.conn.execute(
+                'SELECT channel, key FROM items WHERE article = ?',
+                (article,)):
+            self.search.add_text(k, key, text)
+
+    def _urls(self, k, old_items):
+        """ Returns old items of the channel indexed by normalized link
+        """
+        by_url = {}
+        for (key, url) in self.conn.execute(
+                'SELECT key, url FROM items WHERE channel = ?', (k,)):
+            if key in old_items:
+                by_url.setdefault(url, old_items[key])
+        for item in old_items.values():
+            if not item.is_stored():
+                by_url.setdefault(normalize_url(item.link), item)
+        return by_url
+
+    def _duplicate(self, k, item, url, articles):
+        """ Returns (channel, key, article, new) of an item which is stored
+            already and has the same normalized link (url) or fingerprint as
+            the item, or None. 'articles' are the duplicates found in this
+            merge, which are not stored yet.
+        """
+        fp = fingerprint(item.title, item.summary)
+        row = self.conn.execute(
+            'SELECT channel, key, article, new FROM items WHERE url = ? '
+            'UNION ALL SELECT channel, key, article, new FROM items '
+            'WHERE fingerprint = ? LIMIT 1', (url, fp)).fetchone()
+        if row is None:
+            row = articles.get(url) or articles.get(fp)
+        else:
+            # Flag can be changed in this session but not saved yet
+            row = row[:3] + (self.dirty_items.get(row[:2], bool(row[3])),)
+        if row is None:
+            articles[url] = (k, item.key, item.article, item.new)
+            if fp is not None:
+                articles[fp] = articles[url]
+        return row
 
     def merge(self):
         # 'new' flag equals True if an item hasn't been read, otherwise it is False
@@ -55,44 +554,97 @@ class RssDatabase:
         # channels with the same name are considered the same
     
         # items are considered the same if they belong to the same channel and
-        # their 'link' fields are equal
+        # their keys (GUID or normalized link) or normalized links are equal.
+        # The same article in other channels shares 'new' flag.
     
+        start = time.time()
+
+        # History length of each channel
+        hist_lens = {ch['conf'].name: ch['conf'].history_length
+                     for ch in self.rssc.channels}
+
+        articles = {} # url or fingerprint -> duplicate found in this merge
+        self.added = {}
         for k in self.new_channels:
-            if k in self.channels: # channel already exists in the previous session
-                
-                # Review new items
-                links = [item['link'] for item in self.channels[k]]
-                for i in range(len(self.new_channels[k])):
-                    if self.new_channels[k][i]['link'] not in links:
-                        # If an item didn't exist in the previous session,
-                        # mark it as new
-                        self.new_channels[k][i]['new'] = True
-                    else:
-                        # If an item existed in the previous session,
-                        # copy 'new' flag from that session
-                        index = links.index(self.channels[k][i]['link'])
-                        self.new_channels[k][i]['new'] = self.channels[k][index]['new']
-
-                # Review old items
-                links = [item['link'] for item in self.new_channels[k]]
-                for i in range(len(self.channels[k])):
-                    # if an item is not provided by RSS client, it is considered
-                    # historical and it should be added to the list of items as it is
-                    if self.channels[k][i]['link'] not in links:
-                        self.new_channels[k].append(self.channels[k][i])
-
-                # Check how many items should be displayed for each channel
-                # and clip the list accordingly
-                i = [ch['conf']['Name'] for ch in self.rssc.channels].index(k)
-                hist_len = int(self.rssc.channels[i]['conf']['HistoryLength'])
-                self.new_channels[k] = self.new_channels[k][:hist_len]
-                
-            else: # new channel added to the config directory            
-            
-                # mark all the items as new
-                for item in self.new_channels[k]:
-                    item['new'] = True
-                    
-        self.channels = self.new_channels
+            items = self.new_channels[k]
+
+            # Review new items. Items from the previous session are indexed
+            # by key and by normalized link, so that an item whose GUID
+            # appeared or whose link got tracking parameters is the same
+            # item (first occurrence wins).
+            old_items = {}
+            for item in self.channels[k]:
+                old_items.setdefault(item.key, item)
+            by_url = None # built when an item isn't found by key
+            matched = set() # keys of the old items which are in the feed
+            added = 0
+            duplicates = 0
+            for item in items:
+                old = old_items.get(item.key)
+                dup = None
+                if old is None:
+                    if by_url is None:
+                        by_url = self._urls(k, old_items)
+                    url = normalize_url(item.link)
+                    old = by_url.get(url)
+                if old is None:
+                    dup = self._duplicate(k, item, url, articles)
+                    if dup is not None and dup[0] == k:
+                        # Link has changed but the content is the same
+                        old = old_items.get(dup[1])
+                if old is not None:
+                    # If an item existed in the previous session,
+                    # copy 'new' flag from that session
+                    item.new = old.new
+                    item.article = old.article
+                    matched.add(old.key)
+                elif dup is not None:
+                    # The same article in another channel, it is downloaded
+                    # once and read once
+                    item.article = dup[2]
+                    item.new = dup[3]
+                    duplicates += 1
+                    added += item.new
+                else:
+                    # If an item didn't exist in the previous session,
+                    # mark it as new
+                    item.new = True
+                    added += 1
+
+            # Review old items
+            # if an item is not provided by RSS client, it is considered
+            # historical and it should be added to the list of items as it is
+            keys = set(item.key for item in items)
+            items.extend(item for item in self.channels[k]
+                         if item.key not in keys and item.key not in matched)
+
+            # Check how many items should be displayed for each channel
+            # and clip the list accordingly
+            self.new_channels[k] = items[:hist_lens.get(k)]
+
+            self.added[k] = added
+            Stats.add('channel', k, new_items=added, duplicates=duplicates)
+
+        # Only modified channels have to be saved. Channels which haven't
+        # changed since the previous session are not even loaded.
+        for k in self.new_channels:
+            if k not in self.channels or self.channels[k] != self.new_channels[k]:
+                self.channels[k] = self.new_channels[k]
+                self.unread[k] = sum(item.new for item in self.channels[k])
+                self.dirty_channels.add(k)
+                if self.search.loaded:
+                    self.search.update(k, self.channels[k])
+
+        # Channels removed from the config directory are discarded
+        for k in self.channels.names - set(hist_lens):
+            if self.channels.is_loaded(k):
+                del self.channels[k]
+            self.unread.pop(k, None)
+            self.dirty_channels.add(k)
+            if self.search.loaded:
+                self.search.update(k, [])
+        self.channels.names &= set(hist_lens)
+        self.channels.names |= set(self.new_channels)
+        Stats.add('database', self.path_db, merge_time=time.time() - start)
 
                 
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from email.utils import parsedate_tz, mktime_tz
+import random
+import re
+import time
+
+# Channels without RefreshInterval are read twice within the interval in
+# which they publish new items, but not more often than MIN_DELAY [s] and
+# not less often than MAX_DELAY [s]. Hints of the servers are taken into
+# account up to MAX_DELAY.
+POLL_RATIO = 0.5
+MIN_DELAY = 15 * 60
+MAX_DELAY = 24 * 3600
+
+# Days of skipDays, in the order of time.struct_time.tm_wday
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday',
+        'sunday')
+
+_max_age = re.compile(r'max-age\s*=\s*"?(\d+)', re.I)
+
+def _http_time(value):
+    parsed = parsedate_tz(value) if value else None
+    return mktime_tz(parsed) if parsed else None
+
+def server_hints(headers, now=None):
+    """ Returns how long the server asks not to download the feed again
+        [s] (Cache-Control, Expires, Retry-After), 0 if it doesn't
+    """
+    if now is None:
+        now = time.time()
+    delays = [0]
+    cache_control = headers.get('Cache-Control', '')
+    match = _max_age.search(cache_control)
+    if match:
+        delays.append(int(match.group(1)))
+    elif 'no-cache' not in cache_control and 'no-store' not in cache_control:
+        # Expires is relative to the clock of the server
+        expires = _http_time(headers.get('Expires'))
+        if expires is not None:
+            delays.append(expires - (_http_time(headers.get('Date')) or now))
+    retry_after = headers.get('Retry-After', '').strip()
+    if retry_after.isdigit():
+        delays.append(int(retry_after))
+    elif retry_after:
+        delays.append((_http_time(retry_after) or now) - now)
+    return max(delays)
+
+def feed_hints(feed):
+    """ Returns hints of the feed: ttl [minutes] or None, hours (GMT) and
+        days in which the feed shouldn't be read
+    """
+    try:
+        ttl = float(feed.get('ttl'))
+    except (TypeError, ValueError):
+        ttl = None
+    hours = set()
+    for hour in feed.get('skip_hours', []):
+        try:
+            hours.add(int(hour) % 24)
+        except (TypeError, ValueError):
+            pass
+    days = set(day.strip().lower() for day in feed.get('skip_days', [])
+               if day) & set(DAYS)
+    return {'ttl': ttl, 'skip_hours': sorted(hours),
+            'skip_days': [day for day in DAYS if day in days]}
+
+def _skip(t, hours, days):
+    """ Moves the time out of the hours and days in which the feed shouldn't
+        be read
+    """
+    if not hours and not days:
+        return t
+    for _ in range(24 * 7):
+        tm = time.gmtime(t)
+        if tm.tm_hour not in hours and DAYS[tm.tm_wday] not in days:
+            return t
+        t = t - t % 3600 + 3600 # beginning of the next hour
+    return t # every hour is skipped, hints are ignored
+
+class Scheduler:
+    """ Decides when channels should be refreshed. Refresh times are spread
+        randomly, so that channels don't end up being refreshed all at once.
+        Broken channels are retried less and less often.
+        Channels without RefreshInterval are refreshed according to how
+        often they publish new items. Hints of the servers and of the feeds
+        are respected. The schedule is kept between the sessions, so that
+        channels which are not due are not downloaded at start.
+    """
+    def __init__(self, default_interval=None, jitter=0.1, max_backoff=24*3600,
+                 schedule=None):
+        self.default_interval = default_interval # [s], None - never refresh
+        self.jitter = jitter           # relative
+        self.max_backoff = max_backoff # [s]
+        self.next = {}                 # channel name -> time of next refresh
+                                       # in this session
+        # Channel name -> record saved between the sessions:
+        # title, subtitle - of the feed, to be displayed if it isn't refreshed
+        # fetched - time of the last refresh
+        # due - time of the next refresh
+        # interval - observed interval between new items [s] or None
+        # published - time when new items were found last time or None
+        # failures - failures in a row
+        # ttl, skip_hours, skip_days - hints of the feed (see feed_hints)
+        self.channels = dict(schedule or {})
+
+    def interval(self, ch):
+        """ Returns refresh interval of the channel [s] or None if it
+            shouldn't be refreshed
+        """
+        interval = ch['conf'].refresh_interval * 60
+        if interval > 0:
+            return interval
+        return self.default_interval
+
+    def feed(self, ch):
+        """ Returns title & subtitle of the channel saved by the last refresh
+        """
+        record = self.channels.get(ch['conf'].name, {})
+        return {k: record[k] for k in ('title', 'subtitle') if record.get(k)}
+
+    def due(self, channels, now=None, force=False):
+        """ Returns channels which should be refreshed now. Channels which
+            haven't been refreshed in this session are due when the schedule
+            of the previous sessions says so or if 'force' is True.
+        """
+        if now is None:
+            now = time.time()
+        due = []
+        for ch in channels:
+            name = ch['conf'].name
+            if ch['updating']:
+                continue
+            if name in self.next:
+                next_time = self.next[name]
+            elif force:
+                next_time = now
+            else:
+                next_time = self.channels.get(name, {}).get('due', now)
+            if next_time is not None and next_time <= now:
+                due.append(ch)
+        return due
+
+    def done(self, ch, added=0, now=None):
+        """ Schedules next refresh of the channel which has been refreshed.
+            'added' is the number of new items which have been found.
+        """
+        if now is None:
+            now = time.time()
+        name = ch['conf'].name
+        record = self.channels.setdefault(name, {})
+        hints = ch.get('hints', {})
+        if not ch['broken']:
+            record.update((k, v) for (k, v) in ch['rss'].get('feed', {}).items()
+                          if k in ['title', 'subtitle'])
+            if 'skip_hours' in hints:
+                # Feed has been downloaded, not only validated
+                record.update((k, hints.get(k)) for k in
+                              ['ttl', 'skip_hours', 'skip_days'])
+            if added:
+                if record.get('published'):
+                    observed = (now - record['published']) / added
+                    interval = record.get('interval')
+                    record['interval'] = observed if interval is None \
+                                         else (interval + observed) / 2
+                record['published'] = now
+        record['fetched'] = now
+
+        configured = ch['conf'].refresh_interval * 60
+        if configured > 0:
+            delay = configured
+        else:
+            delay = self._adaptive(record, now)
+
+        if ch['broken']:
+            # Exponential backoff
+            record['failures'] = record.get('failures', 0) + 1
+            delay = min(delay * 2 ** record['failures'],
+                        max(delay, self.max_backoff))
+        else:
+            record['failures'] = 0
+
+        # Servers and feeds may ask to be read less often
+        hinted = max(hints.get('delay', 0), (record.get('ttl') or 0) * 60)
+        delay = max(delay, min(hinted, MAX_DELAY))
+
+        jitter = random.uniform(-self.jitter, self.jitter)
+        record['due'] = _skip(now + delay * (1 + jitter),
+                              record.get('skip_hours') or [],
+                              record.get('skip_days') or [])
+        if self.interval(ch) is None:
+            self.next[name] = None
+        else:
+            self.next[name] = record['due']
+
+    def _adaptive(self, record, now):
+        """ Returns delay of the next refresh of a channel which publishes
+            in the interval observed so far. Interval grows if the channel
+            hasn't published anything for longer.
+        """
+        published = record.get('published')
+        quiet = now - published if published else 0
+        delay = max(record.get('interval') or 0, quiet) * POLL_RATIO
+        return min(max(delay, self.default_interval or MIN_DELAY), MAX_DELAY)
+
+    def wait_time(self, now=None):
+        """ Returns time until the next refresh [s] or None if nothing is
+            scheduled
+        """
+        if now is None:
+            now = time.time()
+        times = [t for t in self.next.values() if t is not None]
+        if not times:
+            return None
+        return max(0, min(times) - now)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import marshal
+import os
+import time
+from array import array
+from Identity import MARKUP, WORD
+from Storage import save_atomic
+import Stats
+
+INDEX_VERSION = 2
+
+def terms(text):
+    """ Returns set of the words of the text (lowercase, HTML tags and
+        entities skipped)
+    """
+    return set(WORD.findall(MARKUP.sub(u' ', text).lower()))
+
+class SearchIndex:
+    """ Inverted index of titles and summaries (optionally full text) of the
+        items of all the channels. It is kept in memory and saved to a file.
+        Items are identified by (channel, key).
+    """
+    def __init__(self, path_index=None):
+        self.path_index = path_index
+        self.loaded = False
+        self.changed = False  # index has to be saved
+        self.keys = []        # doc -> (channel, key) or None if removed
+        self.docs = {}        # channel -> {key: doc}
+        self.postings = {}    # term -> array of docs
+        self.removed = 0      # docs which are still in the postings
+
+    def load(self, conn):
+        """ Reads the index from the file and brings it up to date with the
+            database (which can be modified by other sessions)
+        """
+        start = time.time()
+        if self.path_index and os.path.isfile(self.path_index):
+            try:
+                with open(self.path_index, 'rb') as f:
+                    version, keys, postings = marshal.load(f)
+            except Exception:
+                pass # index will be built again
+            else:
+                if version == INDEX_VERSION:
+                    self._restore(keys, postings)
+        self.loaded = True
+        self._reconcile(conn)
+        Stats.add('search', self.path_index, load_time=time.time() - start,
+                  docs=len(self.keys) - self.removed)
+
+    def _restore(self, keys, postings):
+        self.keys = keys
+        self.docs = {}
+        for (doc, key) in enumerate(keys):
+            if key is None:
+                self.removed += 1
+            else:
+                self.docs.setdefault(key[0], {})[key[1]] = doc
+        self.postings = {term: array('I', docs)
+                         for (term, docs) in postings.iteritems()}
+
+    def _reconcile(self, conn):
+        """ Adds items which are not indexed yet, removes the ones which are
+            not stored any more
+        """
+        stored = {}
+        for (channel, key) in conn.execute('SELECT channel, key FROM items'):
+            stored.setdefault(channel, set()).add(key)
+
+        for channel in set(self.docs) - set(stored):
+            self.update(channel, [])
+        for (channel, keys) in stored.items():
+            indexed = self.docs.get(channel, {})
+            for key in set(indexed) - keys:
+                self._remove(channel, key)
+            if keys - set(indexed):
+                # The oldest first, so that newer items have higher docs
+                for (title, key, summary) in conn.execute(
+                        'SELECT title, key, summary FROM items '
+                        'WHERE channel = ? ORDER BY position DESC',
+                        (channel,)):
+                    if key not in indexed:
+                        self._add(channel, key, title + u' ' + summary)
+        self._compact()
+
+    def update(self, channel, items):
+        """ Indexes the items of the channel. Items which are not listed any
+            more are removed from the index.
+        """
+        indexed = self.docs.get(channel, {})
+        keys = set(item.key for item in items)
+        for key in set(indexed) - keys:
+            self._remove(channel, key)
+        for item in reversed(items): # the oldest first
+            if item.key not in indexed:
+                self._add(channel, item.key,
+                          item.title + u' ' + item.summary)
+        if not self.docs.get(channel):
+            self.docs.pop(channel, None)
+        self._compact()
+
+    def add_text(self, channel, key, text):
+        """ Indexes full text of an item
+        """
+        doc = self.docs.get(channel, {}).get(key)
+        if doc is not None:
+            self._add_terms(doc, terms(text.decode('utf-8', 'replace')))
+
+    def _add(self, channel, key, text):
+        doc = len(self.keys)
+        self.keys.append((channel, key))
+        self.docs.setdefault(channel, {})[key] = doc
+        self._add_terms(doc, terms(text))
+
+    def _add_terms(self, doc, words):
+        for term in words:
+            docs = self.postings.get(term)
+            if docs is None:
+                docs = self.postings[term] = array('I')
+            docs.append(doc)
+        self.changed = True
+
+    def _remove(self, channel, key):
+        doc = self.docs[channel].pop(key)
+        self.keys[doc] = None
+        self.removed += 1
+        self.changed = True
+
+    def _compact(self):
+        """ Removes docs which are not used any more from the postings, if
+            there are many of them. Docs are numbered again.
+        """
+        if self.removed <= len(self.keys) // 2:
+            return
+        numbers = array('i', [-1]) * len(self.keys)
+        keys = []
+        for (doc, key) in enumerate(self.keys):
+            if key is not None:
+                numbers[doc] = len(keys)
+                keys.append(key)
+        postings = {}
+        for (term, docs) in self.postings.iteritems():
+            docs = array('I', [numbers[doc] for doc in docs
+                               if numbers[doc] >= 0])
+            if docs:
+                postings[term] = docs
+        self.keys = keys
+        self.postings = postings
+        self.docs = {}
+        for (doc, (channel, key)) in enumerate(keys):
+            self.docs.setdefault(channel, {})[key] = doc
+        self.removed = 0
+
+    def search(self, query):
+        """ Returns (channel, key) of the items which contain all the words
+            of the query, most recently indexed first. Words ending with '*'
+            are prefixes.
+        """
+        start = time.time()
+        postings = []
+        for word in query.lower().split():
+            # Word with punctuation (e.g. e-mail) is a few terms
+            parts = WORD.findall(word)
+            for (i, term) in enumerate(parts):
+                if word.endswith('*') and i == len(parts) - 1:
+                    docs = set()
+                    for (t, d) in self.postings.iteritems():
+                        if t.startswith(term):
+                            docs.update(d)
+                else:
+                    docs = self.postings.get(term, ())
+                postings.append(docs)
+
+        # The rarest term first, so that the intersection is small
+        postings.sort(key=len)
+        result = set(postings[0]) if postings else set()
+        for docs in postings[1:]:
+            if not result:
+                break
+            result.intersection_update(docs)
+
+        keys = self.keys
+        found = [keys[doc] for doc in sorted(result, reverse=True)
+                 if keys[doc] is not None]
+        Stats.add('search', self.path_index, query_time=time.time() - start,
+                  queries=1)
+        return found
+
+    def save(self):
+        """ Saves the index if it has changed
+        """
+        if self.path_index and self.changed:
+            save_atomic(self.path_index,
+                        (INDEX_VERSION, self.keys,
+                         {term: docs.tostring() for (term, docs)
+                          in self.postings.iteritems()}), marshal.dump)
+            self.changed = False
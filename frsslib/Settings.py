@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from configobj import ConfigObj
+import os.path
+
+def read_settings(path_settings):
+    """ Reads global settings of the application. Missing file or missing
+        options are replaced by default values.
+    """
+    default_values = dict(
+    Workers        = 8,  # channels updated at the same time
+    HostWorkers    = 2,  # channels updated at the same time from one host
+    CacheSize      = 50, # size of the full text cache [MB]
+    CacheTTL       = 30, # full text is downloaded again after [days]
+    HttpTimeout    = 10, # timeout of full text downloads [s]
+    HttpRetries    = 2,  # retries of failed downloads
+    HostConnections= 4,  # connections kept alive for each host
+    MaxPageSize    = 5,  # full text of larger pages is not read [MB]
+    Prefetch       = 0,  # download full text in the background
+    PrefetchWorkers= 2,  # full texts downloaded at the same time
+    PrefetchMemory = 20, # memory for texts which are not read yet [MB]
+    DaemonInterval = 30, # refresh interval of daemon mode [minutes]
+    SearchFullText = 0,  # index full text of the items for searching
+    BuiltinPager   = 0,  # display text in frss instead of less
+    ExtractWorkers = 0,  # processes extracting full text in bulk (0 - CPUs)
+    )
+    settings = ConfigObj(default_values)
+
+    if os.path.isfile(path_settings):
+        settings.update(ConfigObj(path_settings))
+
+    return settings
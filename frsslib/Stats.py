@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import time
+
+# Statistics are collected only if they are enabled
+enabled = False
+
+# (kind, name) -> {counter: value}, e.g. ('channel', 'Some News') ->
+# {'download_time': 0.2, 'bytes': 12345}
+_records = {}
+_lock = threading.Lock()
+
+class _Timer(object):
+    """ Adds time spent in 'with' block to '<stage>_time' counter
+    """
+    __slots__ = ('kind', 'name', 'counter', 'start')
+
+    def __init__(self, kind, name, stage):
+        self.kind = kind
+        self.name = name
+        self.counter = stage + '_time'
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        add(self.kind, self.name, **{self.counter: time.time() - self.start})
+        return False
+
+class _NoTimer(object):
+    """ Timer which is used when statistics are disabled
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_no_timer = _NoTimer()
+
+def enable():
+    global enabled
+    enabled = True
+
+def add(kind, name, **counters):
+    """ Adds values to the counters of e.g. a channel (kind='channel')
+    """
+    if not enabled:
+        return
+    with _lock:
+        record = _records.setdefault((kind, name), {})
+        for (counter, value) in counters.items():
+            record[counter] = record.get(counter, 0) + value
+
+def timer(kind, name, stage):
+    """ Returns context manager which measures time of a stage
+    """
+    if not enabled:
+        return _no_timer
+    return _Timer(kind, name, stage)
+
+def reset():
+    with _lock:
+        _records.clear()
+
+def totals(kind):
+    """ Returns sums of the counters of e.g. all the channels
+    """
+    with _lock:
+        records = [dict(record) for ((k, _), record) in _records.items()
+                   if k == kind]
+    result = {}
+    for record in records:
+        for (counter, value) in record.items():
+            result[counter] = result.get(counter, 0) + value
+    return result
+
+def report():
+    """ Returns statistics as text: totals of each kind and the slowest
+        channels, full texts etc.
+    """
+    with _lock:
+        records = {key: dict(record) for (key, record) in _records.items()}
+
+    lines = []
+    for kind in sorted(set(kind for (kind, _) in records)):
+        named = [(name, record) for ((k, name), record) in records.items()
+                 if k == kind]
+        lines.append('%s (%d)' % (kind, len(named)))
+
+        sums = totals(kind)
+        for counter in sorted(sums):
+            if counter.endswith('_time'):
+                lines.append('  %-20s %10.3f s' % (counter, sums[counter]))
+            else:
+                lines.append('  %-20s %10d' % (counter, sums[counter]))
+
+        # Where most of the time is spent
+        spent = lambda record: sum(value for (counter, value) in record.items()
+                                   if counter.endswith('_time'))
+        slowest = sorted(named, key=lambda (_, record): -spent(record))[:5]
+        if len(named) > 1:
+            lines.append('  slowest:')
+            for (name, record) in slowest:
+                if isinstance(name, unicode):
+                    name = name.encode('utf-8')
+                lines.append('    %8.3f s  %s' % (spent(record), name))
+    return '\n'.join(lines)
+
+def write(path):
+    """ Appends statistics to a file, one JSON object per line
+    """
+    with _lock:
+        records = sorted(_records.items())
+    now = time.time()
+    with open(path, 'a') as f:
+        for ((kind, name), record) in records:
+            line = dict(record, kind=kind, name=name, time=now)
+            f.write(json.dumps(line, sort_keys=True) + '\n')
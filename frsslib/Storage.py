@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+
+def save_atomic(path, obj, dump=None):
+    """ Saves the object to a file using 'dump' (pickle by default). File is
+        replaced at once, so other sessions never read it half-written.
+    """
+    if dump is None:
+        dump = lambda obj, f: pickle.dump(obj, f, 2)
+    path_tmp = '%s.%d' % (path, os.getpid())
+    try:
+        with open(path_tmp, 'wb') as f:
+            dump(obj, f)
+        os.rename(path_tmp, path)
+    except:
+        if os.path.isfile(path_tmp):
+            os.remove(path_tmp)
+        raise
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+import threading
+from Storage import save_atomic
+
+class Templates:
+    """ Content containers learned for each host from the pages processed by
+        readability: host -> XPath of the element containing the article.
+        Articles of a host usually share the layout, so the next ones can
+        be found without scoring the whole page. Templates are learned by
+        the prefetching threads as well.
+    """
+    def __init__(self, path=None, selectors=None):
+        self.path = path
+        self.selectors = dict(selectors or {})
+        self.changed = False # selectors are different than in the file
+        self.lock = threading.Lock()
+
+    def load(self):
+        """ Loads templates learned in the previous sessions
+        """
+        if self.path and os.path.isfile(self.path):
+            with open(self.path, 'rb') as f:
+                self.selectors = pickle.load(f)
+
+    def save(self):
+        """ Saves templates to a file if they have changed
+        """
+        if self.path and self.changed:
+            with self.lock:
+                selectors = dict(self.selectors)
+                self.changed = False
+            save_atomic(self.path, selectors)
+
+    def get(self, host):
+        with self.lock:
+            return self.selectors.get(host)
+
+    def learn(self, host, selector):
+        """ Sets template of the host, None forgets it
+        """
+        with self.lock:
+            if self.selectors.get(host) != selector:
+                if selector is None:
+                    self.selectors.pop(host, None)
+                else:
+                    self.selectors[host] = selector
+                self.changed = True
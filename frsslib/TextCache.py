@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sqlite3
+import time
+
+class TextCache:
+    """ Keeps full text of the items on disk, so that it doesn't have to be
+        downloaded again. Least recently used texts are discarded when the
+        cache exceeds its size. Texts older than 'ttl' are not used.
+    """
+    def __init__(self, path_cache, max_size, ttl):
+        self.max_size = max_size  # bytes
+        self.ttl = ttl            # seconds
+        self.hits = 0             # in this session
+        self.misses = 0           # in this session
+
+        self.conn = sqlite3.connect(path_cache)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS texts ('
+                          'url TEXT PRIMARY KEY, text BLOB, size INTEGER, '
+                          'stored REAL, accessed REAL)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS texts_accessed '
+                          'ON texts (accessed)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS stats ('
+                          'name TEXT PRIMARY KEY, value INTEGER)')
+        self.conn.commit()
+
+    def has(self, url):
+        """ Tells you whether there is valid text for the url. Statistics are
+            not affected.
+        """
+        row = self.conn.execute('SELECT 1 FROM texts WHERE url = ? AND '
+                                'stored >= ?',
+                                (url, time.time() - self.ttl)).fetchone()
+        return row is not None
+
+    def get(self, url):
+        """ Returns cached text or None if there is no valid text for the url
+        """
+        now = time.time()
+        row = self.conn.execute('SELECT text, stored FROM texts WHERE url = ?',
+                                (url,)).fetchone()
+        if row is None or row[1] + self.ttl < now:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        with self.conn:
+            self.conn.execute('UPDATE texts SET accessed = ? WHERE url = ?',
+                              (now, url))
+        return str(row[0])
+
+    def put(self, url, text):
+        """ Stores the text and discards the least recently used texts if
+            the cache is too big
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO texts VALUES '
+                              '(?, ?, ?, ?, ?)',
+                              (url, buffer(text), len(text), now, now))
+            self._evict()
+
+    def _evict(self):
+        # Expired texts are removed first
+        self.conn.execute('DELETE FROM texts WHERE stored < ?',
+                          (time.time() - self.ttl,))
+
+        size = self.conn.execute('SELECT SUM(size) FROM texts').fetchone()[0] or 0
+        if size <= self.max_size:
+            return
+
+        urls = []
+        for (url, text_size) in self.conn.execute(
+                'SELECT url, size FROM texts ORDER BY accessed'):
+            if size <= self.max_size:
+                break
+            urls.append((url,))
+            size -= text_size
+        self.conn.executemany('DELETE FROM texts WHERE url = ?', urls)
+
+    def stats(self):
+        """ Returns statistics collected over all the sessions
+        """
+        stats = dict(self.conn.execute('SELECT name, value FROM stats'))
+        entries, size = self.conn.execute(
+            'SELECT COUNT(*), SUM(size) FROM texts').fetchone()
+        return {'entries': entries,
+                'size': size or 0,
+                'hits': stats.get('hits', 0) + self.hits,
+                'misses': stats.get('misses', 0) + self.misses}
+
+    def close(self):
+        """ Saves statistics of this session and closes the cache
+        """
+        with self.conn:
+            for (name, value) in (('hits', self.hits), ('misses', self.misses)):
+                self.conn.execute('INSERT OR IGNORE INTO stats VALUES (?, 0)',
+                                  (name,))
+                self.conn.execute('UPDATE stats SET value = value + ? '
+                                  'WHERE name = ?', (value, name))
+        self.hits = self.misses = 0
+        self.conn.close()
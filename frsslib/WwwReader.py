@@ -2,66 +2,229 @@
 # -*- coding: utf-8 -*-
 
 from readability.readability import Document
-import requests
-from bs4 import BeautifulSoup
+from readability.cleaners import html_cleaner
+from readability.encoding import get_encoding, fix_charset
+from lxml.etree import iterwalk
+from lxml.html import HTMLParser
+from urlparse import urlparse
+import codecs
 import re
-import logging
+import Http
+import Stats
 
+# Control characters to make headers bold & highlighted
+BOLD_ON = u'\033[96m\033[1m'
+BOLD_OFF = u'\033[0m'
+
+_spaces = re.compile(u'[ \t]+')                # TABs & multiple spaces
+_newlines = re.compile('\n{3,}')               # multiple \n
+_indents = re.compile('^ +', re.MULTILINE)     # indents
+_specials = re.compile('^[^a-zA-Z]+$', re.MULTILINE) # lines without letters
+
+# Content found by a template is suspicious if it is shorter [characters],
+# readability retries with the same limit (retry_length)
+MIN_LENGTH = 250
+# Template is learned only if its content differs from the one of readability
+# by less than this fraction of the length
+MAX_DIFFERENCE = 0.2
+
+# Beginning of the page where encoding is looked for [bytes]
+SNIFF_SIZE = 4096
+
+_charset = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+def _encoding(content_type, head):
+    """ Returns encoding of the page declared by the server (Content-Type)
+        or found in the beginning of the page the same way readability does
+        it (meta tags, then chardet)
+    """
+    match = _charset.search(content_type)
+    # Beginning of the page is cut after a tag, not in the middle of a
+    # character
+    candidates = [match.group(1)] if match else []
+    candidates.append(get_encoding(head[:head.rfind('>') + 1] or head))
+    for encoding in candidates:
+        try:
+            return codecs.lookup(fix_charset(encoding)).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+class _Document(Document):
+    """ readability Document built from already parsed page. Tree of the
+        summary is kept, so that it doesn't have to be parsed again.
+    """
+    def _parse(self, doc):
+        # Cleaner works on a copy, so the page can be parsed again if
+        # readability retries
+        doc = html_cleaner.clean_html(doc)
+        doc.resolve_base_href()
+        return doc
+
+    def get_clean_html(self):
+        self.summary_tree = self.html
+        return Document.get_clean_html(self)
+
+    def select_best_candidate(self, candidates):
+        # Selector of the content is taken before it is moved to the summary
+        best = Document.select_best_candidate(self, candidates)
+        self.best_selector = _selector(best['elem']) if best else None
+        return best
+
+def _selector(el):
+    """ Returns XPath of the element: path of tags and classes from the
+        closest ancestor with an id. None if there is no such path.
+    """
+    steps = []
+    while el is not None and el.tag not in ['body', 'html']:
+        attr = 'id' if el.get('id') else 'class'
+        value = el.get(attr)
+        if not isinstance(el.tag, basestring) or value and '"' in value:
+            return None
+        steps.append('%s[@%s="%s"]' % (el.tag, attr, value) if value
+                     else el.tag)
+        if attr == 'id':
+            return '//' + '/'.join(reversed(steps))
+        el = el.getparent()
+    if not steps:
+        return None # whole page, nothing to be learned
+    return '//body/' + '/'.join(reversed(steps))
+
+def _select(doc, selector):
+    """ Returns cleaned copy of the element found by the selector or None if
+        there is not exactly one
+    """
+    found = doc.xpath(selector)
+    if len(found) != 1:
+        return None
+    return html_cleaner.clean_html(found[0])
+
+def _length(tree):
+    return len(_spaces.sub(u' ', tree.text_content()).strip())
 
 class WwwReader:
     """ Downloads webpage, extracts main content and converts it to text
     """
     
-    def __init__(self):
-        # Disable messages from 'requests' library
-        requests_log = logging.getLogger("requests")
-        requests_log.setLevel(logging.WARNING)
+    def __init__(self, verbose=True, templates=None):
+        self.verbose = verbose # print progress
+        self.templates = templates # content containers learned per host
 
     def _download(self, url):
         # Print only host name, not the whole url
-        host = re.search('[0-9a-zA-Z\.]+\.[0-9a-zA-Z\.]+', url).group()
-        print 'Downloading full text from ' + host + '...'
+        if self.verbose:
+            host = re.search('[0-9a-zA-Z\.]+\.[0-9a-zA-Z\.]+', url).group()
+            print 'Downloading full text from ' + host + '...'
         
-        # Download HTML
-        response = requests.get(url, timeout=10)
-        return response.content
+        # Download HTML, the content is read while it is parsed
+        return Http.get_page(url)
+
+    def _parse(self, chunks, content_type=''):
+        """ Parses the page chunk by chunk, so that it is never kept in
+            memory as a whole. Returns the document and the size of the page.
+        """
+        chunks = iter(chunks)
+        head = ''
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= SNIFF_SIZE:
+                break
+        # Invalid characters are replaced, then the page is parsed as UTF-8
+        # (like readability does it)
+        decoder = codecs.getincrementaldecoder(
+            _encoding(content_type, head))('replace')
+        parser = HTMLParser(encoding='utf-8')
+        parser.feed(decoder.decode(head).encode('utf-8'))
+        size = len(head)
+        for chunk in chunks:
+            parser.feed(decoder.decode(chunk).encode('utf-8'))
+            size += len(chunk)
+        parser.feed(decoder.decode('', True).encode('utf-8'))
+        return parser.close(), size
 
-    def _extract(self, html):
+    def _extract(self, html, host=None, content_type=''):
+        # Page which has been downloaded as a whole
+        doc, _ = self._parse([html], content_type)
+        return self._extract_doc(doc, host)
+
+    def _extract_doc(self, doc, host=None):
         # Tags to be removed, e.g. '<a>Text<\a>' will be replaced by 'Text'
-        tags = ['a', 'strong', 'em']
-        for tag in tags:
-            pattern = '< ?' + tag + '.*?>(.*?)< ?/' + tag + ' ?>'
-            html = re.sub(pattern, '\\1', html, flags=re.I)
-        
-        return Document(html).summary().encode('utf-8').strip()
-
-    def _html2text(self, html):
-        # bold text is going to stay bold (and highlighted)
-        # (I know, it's not strict - if sb write _BOLD_1 on the webpage, then
-        # we are screwed)
-        html = html.replace('<b>', '_BOLD_1')
-        html = html.replace('</b>', '_BOLD_0')
-        
-        # HTML -> text
-        soup = BeautifulSoup(html)
-
-        text = soup.get_text('\n').encode('utf-8') # Preserve new lines
-        text = text.replace('\t', ' ') # TABs -> space
-        text = re.sub(' +', ' ', text) # multiple space -> single space
-        text = re.sub('\n{3,}', '\n\n', text) # multiple \n -> double \n
-        text = re.sub('^ +', '', text, flags=re.MULTILINE) # remove indents        
-        # remove specjal characters at the beginning of the line
-        text = re.sub('^[^a-zA-Z]+$', '', text, flags=re.MULTILINE)
+        for el in list(doc.iter('a', 'strong', 'em')):
+            el.drop_tag()
+
+        templates = self.templates if host else None
+        selector = templates.get(host) if templates else None
+        if selector:
+            tree = _select(doc, selector)
+            if tree is not None and _length(tree) >= MIN_LENGTH:
+                return tree
+            # Layout has changed, template is learned again
 
-        # control characters to make headers bold & highlighted
-        text = text.replace('_BOLD_1', '\033[96m\033[1m')
-        text = text.replace('_BOLD_0', '\033[0m')
+        document = _Document(doc)
+        document.summary()
+        if templates is not None:
+            templates.learn(host, self._learn(doc, document))
+        return document.summary_tree
+
+    def _learn(self, doc, document):
+        """ Returns selector of the content chosen by readability, if the
+            selector finds nearly the same content in the page
+        """
+        selector = getattr(document, 'best_selector', None)
+        if selector is None:
+            return None
+        tree = _select(doc, selector)
+        if tree is None:
+            return None
+        length = _length(document.summary_tree)
+        if length < MIN_LENGTH or \
+           abs(_length(tree) - length) > length * MAX_DIFFERENCE:
+            return None
+        return selector
+
+    def _html2text(self, tree):
+        # Every piece of text is placed in a separate line, but bold text is
+        # going to stay in line (and highlighted)
+        lines = []
+        inline = [False] # next piece of text continues the last line
+
+        def append(text):
+            if inline[0]:
+                lines[-1] += text
+            else:
+                lines.append(text)
+            inline[0] = True
+
+        for (event, el) in iterwalk(tree, events=('start', 'end')):
+            if el.tag == 'b':
+                append(BOLD_ON if event == 'start' else BOLD_OFF)
+            else:
+                inline[0] = False
+            text = el.text if event == 'start' else el.tail
+            if event == 'start' and not isinstance(el.tag, basestring):
+                text = None # content of a comment
+            if text:
+                append(_spaces.sub(u' ', text))
+
+        text = u'\n'.join(lines).encode('utf-8')
+        text = _newlines.sub('\n\n', text)
+        text = _indents.sub('', text)
+        # remove specjal characters at the beginning of the line
+        text = _specials.sub('', text)
         return text
     
     def read(self, url):
-        html = self._download(url)
-        html = self._extract(html)
-        text = self._html2text(html)
+        """ Returns text of the article. Http.PageError is raised if the
+            link doesn't lead to a web page or the page is too large.
+        """
+        with Stats.timer('fulltext', url, 'download'):
+            (content_type, chunks) = self._download(url)
+            doc, size = self._parse(chunks, content_type)
+        with Stats.timer('fulltext', url, 'extract'):
+            tree = self._extract_doc(doc, urlparse(url).netloc)
+        with Stats.timer('fulltext', url, 'html2text'):
+            text = self._html2text(tree)
+        Stats.add('fulltext', url, bytes=size)
         return text
 
 
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Compares RssDatabase.merge with a naive reference merge on random items
+    of two sessions: links known from the previous session keep their
+    flags, repeated links are taken once (first one wins), items which are
+    not in the feed any more are kept after the new ones and the channel is
+    clipped to HistoryLength.
+    Usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from frsslib.RssDatabase import RssDatabase
+from frsslib.ChannelIndex import ChannelConfig
+from frsslib.Identity import normalize_url
+
+TRIALS = 300
+NAME = u'Channel'
+
+# Links of the same page which differ only in the form
+FORMS = (u'http://example.com/%d', u'http://example.com/%d/',
+         u'http://Example.com/%d?utm_source=rss')
+
+class Client(object):
+    def __init__(self, history_length):
+        conf = ChannelConfig(dict(
+            name=NAME, url=u'', get_full_text=False, show_title=True,
+            show_subtitle=True, history_length=history_length, timeout=30.0,
+            refresh_interval=0.0))
+        self.channels = [{'conf': conf, 'unchanged': False,
+                          'rss': {'feed': {}, 'items': []}}]
+
+    def feed(self, links):
+        self.channels[0]['rss'] = {'feed': {}, 'items': [
+            {'title': u'Item %s' % normalize_url(link), 'link': link,
+             'summary': u'Summary of %s' % normalize_url(link), 'id': None}
+            for link in links]}
+
+def reference(old, links, history_length):
+    """ Returns (link, new) of the items after the merge. 'old' are
+        (link, new) of the previous session, 'links' are in the feed.
+    """
+    flags = {}
+    for (link, new) in old:
+        flags.setdefault(normalize_url(link), new)
+    result = []
+    seen = set()
+    for link in links[:history_length]:
+        url = normalize_url(link)
+        if url not in seen:
+            seen.add(url)
+            result.append((link, flags.get(url, True)))
+    result.extend((link, new) for (link, new) in old
+                  if normalize_url(link) not in seen)
+    return result[:history_length]
+
+def random_links(rnd, pages):
+    return [rnd.choice(FORMS) % rnd.randrange(pages)
+            for _ in range(rnd.randint(0, 2 * pages))]
+
+class MergeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def session(self, path_db, client, links):
+        """ Imports the feed and merges it with the database. Returns the
+            database.
+        """
+        client.feed(links)
+        db = RssDatabase(path_db, client)
+        db.load()
+        db.import_rss()
+        db.merge()
+        return db
+
+    def items(self, db):
+        return [(item.link, item.new) for item in db.channels[NAME]]
+
+    def test_random(self):
+        rnd = random.Random(0)
+        for trial in range(TRIALS):
+            path_db = os.path.join(self.path, '%d.db' % trial)
+            pages = rnd.randint(1, 12)
+            client = Client(rnd.randint(1, 15))
+            history_length = client.channels[0]['conf'].history_length
+
+            # Previous session, some of the items have been read
+            db = self.session(path_db, client, random_links(rnd, pages))
+            for item in db.channels[NAME]:
+                if rnd.random() < 0.5:
+                    db.mark(NAME, item, False)
+            db.save()
+            old = self.items(db)
+            db.conn.close()
+
+            links = random_links(rnd, pages)
+            db = self.session(path_db, client, links)
+            expected = reference(old, links, history_length)
+            self.assertEqual(self.items(db), expected,
+                             'trial %d: %r + %r' % (trial, old, links))
+
+            # The same is stored in the database
+            db.save()
+            db.conn.close()
+            db = RssDatabase(path_db, client)
+            db.load()
+            self.assertEqual(self.items(db), expected)
+            db.conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
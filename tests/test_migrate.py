@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Checks conversion of the database from the old format (pickle with
+    UTF-8 channel names)
+    Usage: python -m unittest discover tests
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from frsslib.RssDatabase import RssDatabase
+
+CHANNELS = {
+    'Wiadomo\xc5\x9bci': [
+        {'title': 'Za\xc5\xbc\xc3\xb3\xc5\x82\xc4\x87', 'new': True,
+         'link': 'http://example.com/1', 'summary': 'G\xc4\x99\xc5\x9bl\xc4\x85'},
+        {'title': u'Second', 'new': False,
+         'link': u'http://example.com/2', 'summary': u'Summary'}],
+    u'News': [
+        {'title': u'Third', 'new': True,
+         'link': u'http://example.com/3', 'summary': u''}],
+}
+
+class MigrateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.path_db = os.path.join(self.path, 'rss.db')
+        with open(self.path_db, 'wb') as f:
+            pickle.dump(CHANNELS, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_migrate(self):
+        db = RssDatabase(self.path_db, None)
+        db.load()
+        name = u'Wiadomości'
+        self.assertEqual(sorted(db.channels.names), [u'News', name])
+        self.assertEqual(db.unread_counts(), {name: 1, u'News': 1})
+        items = db.channels[name]
+        self.assertEqual([(item.title, item.link, item.new) for item in items],
+                         [(u'Zaż\xf3łć', u'http://example.com/1',
+                           True),
+                          (u'Second', u'http://example.com/2', False)])
+        self.assertEqual(items[0].summary, u'Gęślą')
+        db.conn.close()
+        self.assertEqual(sorted(os.listdir(self.path)),
+                         ['rss.db', 'rss.db.pickle'])
+
+    def test_failure(self):
+        # Pickle which can't be converted is left as it is
+        with open(self.path_db, 'wb') as f:
+            pickle.dump({u'Broken': [{'title': u'No link'}]}, f)
+        db = RssDatabase(self.path_db, None)
+        self.assertRaises(KeyError, db.load)
+        self.assertEqual(os.listdir(self.path), ['rss.db'])
+        self.assertTrue(db._is_pickle())
+
+if __name__ == '__main__':
+    unittest.main()
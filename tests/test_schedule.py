@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Checks that a channel whose server answers with an error and asks to
+    wait (Retry-After) is not refreshed earlier than the server asks
+    Usage: python -m unittest discover tests
+"""
+
+import BaseHTTPServer
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from frsslib.RssClient import RssClient
+from frsslib.Scheduler import Scheduler
+from frsslib.ChannelIndex import ChannelConfig
+
+RETRY_AFTER = 7200 # [s]
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.send_response(503)
+        self.send_header('Retry-After', str(RETRY_AFTER))
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class RetryAfterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.httpd = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), _Handler)
+        thread = threading.Thread(target=self.httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.path)
+
+    def test_unavailable(self):
+        conf = ChannelConfig(dict(
+            name=u'Unavailable', get_full_text=False, show_title=True,
+            url=u'http://127.0.0.1:%d/feed' % self.httpd.server_address[1],
+            show_subtitle=True, history_length=15, timeout=5.0,
+            refresh_interval=0.0))
+        ch = {'conf': conf, 'rss': {}, 'broken': False, 'unchanged': False,
+              'updated': 0, 'updating': False, 'hints': {}}
+
+        start = time.time()
+        RssClient(self.path).update(ch)
+        # Download isn't blocked until the time given by the server
+        self.assertLess(time.time() - start, 10)
+        self.assertTrue(ch['broken'])
+        self.assertEqual(ch['hints']['delay'], RETRY_AFTER)
+
+        scheduler = Scheduler(jitter=0)
+        scheduler.done(ch, now=0)
+        self.assertEqual(scheduler.channels[u'Unavailable']['due'],
+                         RETRY_AFTER)
+
+if __name__ == '__main__':
+    unittest.main()